@@ -1,14 +1,93 @@
+import asyncio
+import collections
+import concurrent.futures
+import cProfile
 import glob
+import gzip
+import functools
+import hashlib
+import html.entities
+import http.client
+import http.server
+import inspect
+import json
 import os
+import pstats
+import resource
+import sqlite3
+import sys
+import threading
+import time
+import urllib.parse
+import xml.etree.ElementTree as ET
+import click
+import numpy as np
 import pandas as pd
-import collections
-import random
+import pyarrow as pa
+import pyarrow.ipc
 import matplotlib
+import matplotlib.figure
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 import itertools
 import re
 
+_CACHE_DIR = '.cache'
+_CACHE_VERSION = 5
+_STAGE_CACHE_DIR = os.path.join(_CACHE_DIR, 'stages')
+_STAGE_CACHE_SIZE = 1 << 30
+_FIGURE_CACHE_DIR = os.path.join(_CACHE_DIR, 'figures')
+_AGGREGATES_PATH = os.path.join('output', 'aggregates.pkl')
+_INCREMENTAL_DIR = os.path.join(_CACHE_DIR, 'incremental')
+_DBLP_CACHE_DIR = os.path.join(_CACHE_DIR, 'dblp')
+_INGEST_CHUNK_SIZE = 50000
+_REPLICATE_CHUNK_SIZE = 32
+_GAPI_URL = 'https://gender-api.com/get'
+_ingest_worker_state = None
+_replicate_worker_layout = None
+_profiler = None
+
+_ANALYSIS_STAGES = ['authorships', 'titles', 'export-authorships', 'assume', 'export-assumed', 'cube', 'aggregates',
+                    'plots', 'unknown-names', 'statistics']
+# Figures by name with the view and the position of the aggregates they show and their label
+_FIGURES = {
+    'all_positions': ('db', 'all', 'all positions'),
+    'any_position': ('db', 'any', 'any position'),
+    'first_author': ('db', 'first', 'first author'),
+    'last_author': ('db', 'last', 'last author'),
+    'fields': ('ranked', 'first', 'first author'),
+}
+_FIGURE_STYLE = {
+    'font.family': 'serif',
+    'font.size': 20,
+}
+# Only pgf figures are typeset with LaTeX, other formats are rendered without a TeX installation
+_PGF_STYLE = {
+    'pgf.texsystem': 'pdflatex',
+    'text.usetex': True,
+    'pgf.rcfonts': False,
+}
+_DB_EXCLUDED_VENUES = ['PODS']
+_UNRANKED_VENUES = ['CIDR', 'DASFAA', 'DKE', 'EDBT']
+_NAME_SUFFIXES = {'Jr.', 'Sr.'}
+_NAME_QUOTES = "()'\""
+_ABBREVIATION = re.compile(r'\w+[.]')
+_NOBILIARY_PARTICLES = {'van', 'Van', 'von', 'Von', 'zur', 'Zur', 'den', 'Den', 'der', 'Der', 'del', 'Del', 'de', 'De',
+                        'la', 'La', 'los', 'Los', 'ul', 'Ul', 'al', 'Al', 'da', 'Da', 'el', 'El', 'vom', 'Vom', 'auf',
+                        'Auf', 'des', 'Des', 'di', 'Di', 'dos', 'Dos', 'du', 'Du', 'ten', 'Ten', 'ter', 'Ter', "van't",
+                        "Van't"}
+_INPUT_COLUMNS = ['venue', 'year', 'paper_id', 'title', 'authors']
+_DBLP_RECORD_TAGS = {'article', 'inproceedings', 'proceedings', 'book', 'incollection', 'phdthesis', 'mastersthesis',
+                     'www', 'person', 'data'}
+_DBLP_PAPER_TAGS = {'article', 'inproceedings'}
+_DBLP_ENTITIES = {name: chr(codepoint) for (name, codepoint) in html.entities.name2codepoint.items()}
+_DBLP_SCHEMA = pa.schema([('field', pa.string()), ('venue', pa.string()), ('year', pa.int16()),
+                          ('paper_id', pa.string()), ('title', pa.string()), ('author_position', pa.int16()),
+                          ('author_name', pa.string()), ('author_id', pa.string()),
+                          ('author_position_last', pa.int16())])
+_AUTHORSHIP_COLUMNS = ['field', 'venue', 'year', 'paper_id', 'title', 'author_position', 'author_name', 'author_id',
+                       'man', 'woman', 'neutral', 'unknown']
+
 
 def prepare_names_for_gapi(destination, with_middle_names=True, df=None):
     """
@@ -23,99 +102,611 @@ def prepare_names_for_gapi(destination, with_middle_names=True, df=None):
     if df is None:
         df = authorships(with_genders=False)
 
-    # Extract first, middle and last names from full names
     # Exclude full names that only consist of one name (cannot determine if it's the first or last name)
-    full_names = [author_name.split(" ") for author_name in df['author_name']]
-    first_names = [full_name[0] for full_name in full_names if len(full_name) > 1]
-    middle_names = [full_name[1:-1] for full_name in full_names if len(full_name) > 1]
-    last_names = [full_name[-1] for full_name in full_names if len(full_name) > 1]
-
-    # Clean last names
-    for i, last_name in enumerate(last_names):
-        if last_name == 'Jr.' or last_name == 'Sr.':
-            # Add the last middle name to the last name
-            last_names[i] = f"{middle_names[i][-1]} {last_names[i]}"
-            middle_names[i] = middle_names[i][:-1]
-
-    # Prepare checkable first and middle names
-    # Discard abbreviations and 'nobiliary' particles
-    cleaned_first_names = [name for name in first_names if not re.match(r'\w+[.]', name)]
+    names = parse_author_names(df['author_name'])
     if with_middle_names:
-        no_middle_name = ['van', 'Van', 'von', 'Von', 'zur', 'Zur', 'den', 'Den', 'der', 'Der', 'del', 'Del', 'de',
-                          'De', 'la', 'La', 'los', 'Los', 'ul', 'Ul', 'al', 'Al', 'da', 'Da', 'el', 'El', 'vom', 'Vom',
-                          'auf', 'Auf', 'des', 'Des', 'di', 'Di', 'dos', 'Dos', 'du', 'Du', 'ten', 'Ten', 'ter', 'Ter',
-                          "van't", "Van't", ]
-        cleaned_first_names.extend([name for name_list in middle_names for name in name_list
-                                    if not re.match(r'\w+[.]', name) and name not in no_middle_name])
-    # Discard quotes and brackets
-    cleaned_first_names = [name.strip("()'\"") for name in cleaned_first_names]
-
-    df = pd.DataFrame(cleaned_first_names, columns=['first_name'])
+        first_names = names['candidates'].explode()
+    else:
+        first_names = names['first_name_candidate']
+
+    df = pd.DataFrame({'first_name': first_names.dropna().to_numpy()})
     df.drop_duplicates(inplace=True)
     df.sort_values(['first_name'], inplace=True)
     df.to_csv(destination, index=False, header=['first_name'])
 
 
-def analyse_data(gapi_path):
+def parse_author_names(author_names):
+    """
+    Split full names up into first, middle and last names and derive the names a gender can be looked up for. Every
+    distinct name is parsed once, with string operations on all of their single names together.
+
+    Full names that only consist of one name have neither a first nor middle names (cannot determine if it's the first
+    or last name). 'Jr.' and 'Sr.' belong to the last name. Abbreviations and 'nobiliary' particles are no candidates
+    and quotes and brackets are discarded from them.
+
+    :param author_names:    iterable of strings, full names divided with a space, first name comes first
+    :return:                pd.DataFrame indexed by the distinct names with the columns 'first_name', 'middle_names'
+                            (list), 'last_name', 'first_name_candidate' (NaN if the first name is no candidate) and
+                            'candidates' (list, the first name candidate before the middle names)
+    """
+    index = pd.Index(pd.unique(pd.Series(list(author_names), dtype=object)), name='author_name')
+
+    # One row per single name, 'rows' points back to its full name
+    single_names = pd.Series(index, dtype=object).str.split(' ').explode()
+    rows = single_names.index.to_numpy()
+    single_names = single_names.reset_index(drop=True)
+    tokens = single_names.to_numpy(dtype=object)
+    lengths = np.bincount(rows, minlength=len(index))
+    ends = np.cumsum(lengths)
+    position = np.arange(len(rows)) - (ends - lengths)[rows]
+    with_suffix = np.isin(tokens[ends - 1], list(_NAME_SUFFIXES)) & (lengths > 2)
+    is_first = (position == 0) & (lengths[rows] > 1)
+    is_middle = ~is_first & (position < (lengths - 1 - with_suffix)[rows])
+
+    # Discard abbreviations, 'nobiliary' particles and quotes and brackets
+    cleaned = single_names.str.strip(_NAME_QUOTES)
+    is_candidate = ((is_first | is_middle) & ~single_names.str.match(_ABBREVIATION.pattern).to_numpy(dtype=bool)
+                    & ~(is_middle & single_names.isin(_NOBILIARY_PARTICLES).to_numpy()) & (cleaned != '').to_numpy())
+
+    last_names = tokens[ends - 1]
+    last_names[with_suffix] = tokens[ends[with_suffix] - 2] + ' ' + last_names[with_suffix]
+    first_names = np.where(lengths > 1, tokens[ends - lengths], np.nan)
+    first_name_candidates = np.full(len(index), np.nan, dtype=object)
+    first_name_candidates[rows[is_first & is_candidate]] = cleaned[is_first & is_candidate].to_numpy()
+    return pd.DataFrame({'first_name': first_names,
+                         'middle_names': _group_lists(tokens[is_middle], rows[is_middle], len(index)),
+                         'last_name': last_names,
+                         'first_name_candidate': first_name_candidates,
+                         'candidates': _group_lists(cleaned[is_candidate], rows[is_candidate], len(index))},
+                        index=index)
+
+
+def _parse_author_name(author_name):
+    # Parses a single name like parse_author_names without the overhead of a pd.DataFrame
+    names = author_name.split(' ')
+    if len(names) < 2:
+        return None, [], author_name, None, []
+    last_start = len(names) - 2 if names[-1] in _NAME_SUFFIXES and len(names) > 2 else len(names) - 1
+    first_name, middle_names, last_name = names[0], names[1:last_start], ' '.join(names[last_start:])
+    first_name_candidate = first_name.strip(_NAME_QUOTES) if not _ABBREVIATION.match(first_name) else ''
+    candidates = [first_name_candidate] + [name.strip(_NAME_QUOTES) for name in middle_names
+                                           if not _ABBREVIATION.match(name) and name not in _NOBILIARY_PARTICLES]
+    return (first_name, middle_names, last_name, first_name_candidate or None,
+            [candidate for candidate in candidates if candidate])
+
+
+def _group_lists(values, rows, size):
+    # Values are ordered by their (ascending) rows, split them into one list per row
+    values = list(values)
+    ends = np.cumsum(np.bincount(rows, minlength=size)).tolist()
+    return [values[start:end] for start, end in zip([0] + ends[:-1], ends)]
+
+
+def analyse_data(gapi_path, seed=None, replicates=None, workers=1, streaming=False, from_stage=None, only=None,
+                 show=False, incremental=False):
     """
     Read the csv files given in '/input' (with commas as separators), extract authorships from it and enrich them with
     gender based on the file(s) given under param gapi_path (with semicolons as separators as the csv files returned by
     the Gender-API uses semicolons as separators). It produces plots saved to '/output' and also saves still unknown
     names under '/helper_files/unprocessed_first_names.csv' for future processing by the Gender-API.
 
-    :param gapi_path: path, both a file or a directory is accepted
+    The analysis runs as the stages in _ANALYSIS_STAGES, a stage is skipped if its code, parameters and inputs did not
+    change since its last run. See 'run_stages' for more details.
+
+    :param gapi_path:   path, both a file or a directory is accepted
+    :param seed:        None or int, seed for assuming the gender of unknown and neutral names. Without a seed, the
+                        assumption and all stages depending on it are run every time.
+    :param replicates:  None or int, if given, the plots show the mean and the 95% interval of this many random
+                        assumptions of the gender of unknown and neutral names instead of a single one
+    :param workers:     int, number of processes to parse the input files, compute the replicates and render the plots
+                        with
+    :param streaming:   bool, whether to process the input in chunks with bounded memory instead of loading all
+                        authorships. No authorships are saved to '/output/with_genders', the number of authors in
+                        the statistics is estimated and no stage is skipped then. See 'stream_authorship_counts' for
+                        more details.
+    :param from_stage:  None or str, run this and all following stages even if they did not change
+    :param only:        None or list of str, run only these stages even if they did not change
+    :param show:        bool, whether to show the plots after they were saved
+    :param incremental: bool, whether to only process the years added to the input since the last incremental run.
+                        No authorships are saved to '/output/with_genders' then. See 'append_authorships' for more
+                        details.
+    """
+    if incremental:
+        if replicates or streaming:
+            raise ValueError('Replicates and streaming are not supported in incremental mode')
+        if from_stage or only:
+            raise ValueError('Stages are not supported in incremental mode')
+        df, cube, statistics = _profiled('append', append_authorships, gapi_path, _load_identity_list(), seed, workers)
+        cube.save('output/authorships_cube.feather')
+        aggregates = _profiled('aggregates', _stage_aggregates, cube, _DB_EXCLUDED_VENUES, _UNRANKED_VENUES,
+                               rows_in=len(cube.counts))
+        _profiled('plots', _stage_plots, aggregates, workers, rows_in=_rows(aggregates))
+        _profiled('unknown-names', lambda: prepare_names_for_gapi('helper_files/unprocessed_first_names.csv',
+                                                                  df=df[df.unknown == 1]), rows_in=len(df))
+        _profiled('statistics', _save_statistics, statistics, rows_in=len(statistics))
+        if show:
+            show_figures()
+        return
+
+    if not streaming:
+        run_stages(_analysis_stages(gapi_path, seed, replicates, workers), from_stage=from_stage, only=only)
+        if show:
+            show_figures()
+        return
+
+    if replicates:
+        raise ValueError('Replicates are not supported in streaming mode')
+    if from_stage or only:
+        raise ValueError('Stages are not supported in streaming mode')
+    cube, unknown_names = _profiled('stream', stream_authorship_counts, gapi_path, _load_identity_list(), seed)
+    cube.save('output/authorships_cube.feather')
+    aggregates = _profiled('aggregates', _stage_aggregates, cube, _DB_EXCLUDED_VENUES, _UNRANKED_VENUES,
+                           rows_in=len(cube.counts))
+    _profiled('plots', _stage_plots, aggregates, workers, rows_in=_rows(aggregates))
+    _profiled('unknown-names', lambda: prepare_names_for_gapi('helper_files/unprocessed_first_names.csv',
+                                                              df=pd.DataFrame({'author_name': sorted(unknown_names)})),
+              rows_in=len(unknown_names))
+    _profiled('statistics', lambda: _save_statistics(cube.statistics()), rows_in=len(cube.counts))
+    if show:
+        show_figures()
+
+
+def _analysis_stages(gapi_path, seed, replicates, workers):
+    """
+    Declare the stages of 'analyse_data'. Each stage has the names of the stages whose values it takes as 'inputs', a
+    function to 'run' with these values, the 'params' and 'code' its result depends on besides the inputs, the
+    'outputs' it writes and whether its result may be taken from the 'cache'.
+
+    :return: dict of stages by name in the order they run
     """
     identities = _load_identity_list()
-    df = authorships(with_accuracy=True, identity_list=identities, gapi_path=gapi_path)
-    df.to_csv('output/with_genders/authorships_all_fields.csv', index=False)
-    df_with_assumed = _assume_gender_weighted(df)
-    df_with_assumed.to_csv('output/with_genders/authorships_all_fields_gender_assumed.csv', index=False)
+    # Without a seed, every run assumes other genders
+    assumption = seed if seed is not None else os.urandom(16).hex()
+    views = {'db_excluded': _DB_EXCLUDED_VENUES, 'unranked': _UNRANKED_VENUES}
+    stages = {
+        'authorships': {
+            'inputs': [],
+            'run': lambda: authorships(with_accuracy=True, identity_list=identities, gapi_path=gapi_path,
+                                       workers=workers),
+            'params': {'sources': _analysis_sources_digest(identities, gapi_path)},
+            'code': [authorships, _compact_authorships, _annotate_genders, _parse_authorships],
+        },
+        'titles': {
+            'inputs': [],
+            'run': paper_titles,
+            'params': {'inputs': _input_files_digest()},
+            'code': [paper_titles],
+        },
+        'export-authorships': {
+            'inputs': ['authorships', 'titles'],
+            'run': _stage_export_authorships,
+            'code': [_stage_export_authorships, _with_titles],
+            'outputs': ['output/with_genders/authorships_all_fields.csv'],
+        },
+        'assume': {
+            'inputs': ['authorships'],
+            'run': lambda df: _assume_gender_weighted(df, seed=seed),
+            'params': {'seed': assumption},
+            'code': [_assume_gender_weighted],
+            'cache': seed is not None,
+        },
+        'export-assumed': {
+            'inputs': ['assume', 'titles'],
+            'run': lambda df, titles: _stage_export_assumed(df, titles, _DB_EXCLUDED_VENUES, _UNRANKED_VENUES),
+            'params': views,
+            'code': [_stage_export_assumed, _with_titles],
+            'outputs': ['output/with_genders/authorships_all_fields_gender_assumed.csv',
+                        f"output/with_genders/authorships_db_field_gender_assumed_without_"
+                        f"{'_'.join(_DB_EXCLUDED_VENUES)}.csv",
+                        f"output/with_genders/authorships_all_fields_gender_assumed_without_"
+                        f"{'_'.join(_UNRANKED_VENUES)}.csv"],
+        },
+        'cube': {
+            'inputs': ['assume'],
+            'run': _stage_cube,
+            'code': [_stage_cube, AuthorshipCube, _woman_by_paper],
+            'outputs': ['output/authorships_cube.feather'],
+        },
+        'aggregates': {
+            'inputs': ['cube'],
+            'run': lambda cube: _stage_aggregates(cube, _DB_EXCLUDED_VENUES, _UNRANKED_VENUES),
+            'params': views,
+            'code': [_stage_aggregates, AuthorshipCube, aggregate_authorship_counts],
+        },
+        'plots': {
+            'inputs': ['aggregates'],
+            'run': lambda aggregates: _stage_plots(aggregates, workers),
+            'code': [_stage_plots, render_figures, _render_figure, _draw_moving_averages, _rolling_frames,
+                     _rolling_mean],
+            'outputs': [_AGGREGATES_PATH] + [os.path.join('output', f"{name}.pgf") for name in _FIGURES],
+        },
+        'unknown-names': {
+            'inputs': ['authorships'],
+            'run': lambda df: prepare_names_for_gapi('helper_files/unprocessed_first_names.csv',
+                                                     df=df[df.unknown == 1]),
+            'code': [prepare_names_for_gapi],
+            'outputs': ['helper_files/unprocessed_first_names.csv'],
+        },
+        'statistics': {
+            'inputs': ['authorships'],
+            'run': _stage_statistics,
+            'code': [_stage_statistics, _venue_statistics, _save_statistics],
+            'outputs': ['output/statistics.txt'],
+        },
+    }
+    if replicates:
+        # Aggregate many random assumptions with the gender ratio of all fields
+        stages['aggregates'] = {
+            'inputs': ['assume'],
+            'run': lambda df: _stage_replicate_aggregates(df, _DB_EXCLUDED_VENUES, _UNRANKED_VENUES, replicates, seed,
+                                                          workers),
+            'params': {**views, 'replicates': replicates, 'seed': assumption},
+            'code': [_stage_replicate_aggregates, replicate_aggregate_authorship, _replicate_layout,
+                     _replicate_chunk],
+        }
+    return stages
 
-    # Get all venues from all fields and assume the gender for unknown and neutral names
-    df_with_assumed = pd.read_csv('output/with_genders/authorships_all_fields_gender_assumed.csv')
+
+def _stage_export_authorships(df, titles):
+    _with_titles(df, titles).to_csv('output/with_genders/authorships_all_fields.csv', index=False)
+
+
+def _stage_export_assumed(df_with_assumed, titles, db_excluded, unranked):
+    # The exports keep the titles, which the analysis itself does not need
+    df_with_assumed = _with_titles(df_with_assumed, titles)
+    df_with_assumed.to_csv('output/with_genders/authorships_all_fields_gender_assumed.csv', index=False)
 
     # Get all venues from DB field except PODS
-    df_db_without_pods = _exclude_venue(_get_field(df_with_assumed, ['DB']), ['PODS'])
-    df_db_without_pods.to_csv('output/with_genders/authorships_db_field_gender_assumed_without_PODS.csv')
-    aggregates_db_without_pods = aggregate_authorship(df_db_without_pods)
+    df_db = _exclude_venue(_get_field(df_with_assumed, ['DB']), db_excluded)
+    df_db.to_csv(f"output/with_genders/authorships_db_field_gender_assumed_without_{'_'.join(db_excluded)}.csv")
 
     # Get all fields without conferences not in CS Rankings
-    df_whole_cs_ranked = _exclude_venue(df_with_assumed, ['CIDR', 'DASFAA', 'DKE', 'EDBT'])
-    df_whole_cs_ranked.to_csv('output/with_genders/'
-                              'authorships_all_fields_gender_assumed_without_CIDR_DASFAA_DKE_EDBT.csv')
-    aggregates_whole_cs_ranked = aggregate_authorship(df_whole_cs_ranked, group_attrs=['field', 'year'],
-                                                      funcs={'first': _first_woman_author})
-
-    # Show plots of rolling means of authorships by woman
-    plot_moving_averages_of_authorships(aggregates_db_without_pods['all'], 'all positions', save=False)
-    plot_moving_averages_of_authorships(aggregates_db_without_pods['any'], 'any position', save=False)
-    plot_moving_averages_of_authorships(aggregates_db_without_pods['first'], 'first author', save=False)
-    plot_moving_averages_of_authorships(aggregates_db_without_pods['last'], 'last author', save=False)
-    plot_moving_averages_of_authorships(aggregates_whole_cs_ranked['first'], 'first author', save=False)
+    df_ranked = _exclude_venue(df_with_assumed, unranked)
+    df_ranked.to_csv(f"output/with_genders/authorships_all_fields_gender_assumed_without_{'_'.join(unranked)}.csv")
+
+
+def _with_titles(df, titles):
+    # Add the titles after the paper ids as in the authorships returned with titles
+    df = df.copy()
+    df.insert(df.columns.get_loc('paper_id') + 1, 'title', df['paper_id'].astype(object).map(titles))
+    return df
+
+
+def _stage_cube(df_with_assumed):
+    cube = AuthorshipCube.from_authorships(df_with_assumed)
+    cube.save('output/authorships_cube.feather')
+    return cube
+
+
+def _stage_aggregates(cube, db_excluded, unranked):
+    # Get all venues from DB field except PODS and all fields without conferences not in CS Rankings
+    aggregates_db = cube.select(fields=['DB'], exclude_venues=db_excluded).aggregate()
+    aggregates_ranked = cube.select(exclude_venues=unranked).aggregate(group_attrs=['field', 'year'],
+                                                                       positions=['first'])
+    return aggregates_db, aggregates_ranked
+
+
+def _stage_replicate_aggregates(df_with_assumed, db_excluded, unranked, replicates, seed, workers):
+    woman_ratio = _woman_ratio(df_with_assumed)
+    aggregates_db = replicate_aggregate_authorship(_exclude_venue(_get_field(df_with_assumed, ['DB']), db_excluded),
+                                                   replicates, seed=seed, workers=workers, woman_ratio=woman_ratio)
+    aggregates_ranked = replicate_aggregate_authorship(_exclude_venue(df_with_assumed, unranked), replicates,
+                                                       seed=seed, workers=workers, group_attrs=['field', 'year'],
+                                                       positions=['first'], woman_ratio=woman_ratio)
+    return aggregates_db, aggregates_ranked
+
+
+def _stage_plots(aggregates, workers=1):
+    aggregates_db_without_pods, aggregates_whole_cs_ranked = aggregates
+
+    # Keep the aggregates, so the figures can be rendered again without running the analysis
+    pd.to_pickle({'db': aggregates_db_without_pods, 'ranked': aggregates_whole_cs_ranked}, _AGGREGATES_PATH)
 
     # Save plots of rolling means of authorships by woman
-    plot_moving_averages_of_authorships(aggregates_db_without_pods['all'], 'all positions', save=True, header=False)
-    plot_moving_averages_of_authorships(aggregates_db_without_pods['any'], 'any position', save=True, header=False)
-    plot_moving_averages_of_authorships(aggregates_db_without_pods['first'], 'first author', save=True,
-                                        header=False)
-    plot_moving_averages_of_authorships(aggregates_db_without_pods['last'], 'last author', save=True, header=False)
-    plot_moving_averages_of_authorships(aggregates_whole_cs_ranked['first'], 'first author', save='fields',
-                                        header=False)
-
-    # Extract and save unknown names
-    unknown = df[df.unknown == 1]
-    prepare_names_for_gapi('helper_files/unprocessed_first_names.csv', df=unknown)
+    render_figures(_AGGREGATES_PATH, workers=workers)
+
+
+def _stage_statistics(df):
+    _save_statistics(_venue_statistics(df))
+
 
+def _venue_statistics(df):
+    # Used publication range per venue as well as total number of papers and authors
+    return df.groupby(['venue'], observed=True).agg({'year': ['min', 'max'], 'paper_id': pd.Series.nunique,
+                                                     'author_id': pd.Series.nunique})
+
+
+def _save_statistics(statistics):
     # Save and print used publication range per venue as well as total number of papers and authors
-    statistics = df.groupby(['venue']).agg({'year': ['min', 'max'], 'paper_id': pd.Series.nunique,
-                                            'author_id': pd.Series.nunique}).to_string()
+    statistics = statistics.to_string()
     f = open("output/statistics.txt", "w")
     f.write(statistics)
     f.close()
     click.echo(statistics)
 
 
-def authorships(field=None, with_accuracy=False, identity_list=None, with_genders=True, gapi_path=None):
+def _analysis_sources_digest(identity_list, gapi_path):
+    # The authorships change with the content of the input files and the gender sources
+    sources = _gender_sources_digest(_index_identity_list(identity_list), gapi_path)
+    digest = hashlib.blake2b(digest_size=16)
+    for input_file, field in _input_files():
+        digest.update(_authorships_cache_path(input_file, field, sources).encode())
+    return digest.hexdigest()
+
+
+def _input_files_digest():
+    # The titles only change with the content of the input files
+    digest = hashlib.blake2b(digest_size=16)
+    for input_file, field in _input_files():
+        digest.update(f"{field};{_file_digest(input_file)};".encode())
+    return digest.hexdigest()
+
+
+def run_stages(stages, from_stage=None, only=None, cache_size=None):
+    """
+    Run a pipeline of stages as declared by '_analysis_stages'. The value of each stage and the size and modification
+    time of the files it writes are kept under '.cache/stages' with a hash of its code, parameters and the hashes of its
+    inputs. A stage is skipped if a result with the same hash exists and its files were not changed since. Inputs of
+    the stages to run are taken from the cache or run first. The least recently used results are removed if the cache
+    exceeds cache_size.
+
+    :param stages:      dict of stages by name, the inputs of a stage must be declared before it
+    :param from_stage:  None or str, run this and all following stages even if they did not change
+    :param only:        None or list of str, run only these stages even if they did not change
+    :param cache_size:  None or int, maximum size of the cache in bytes, default: _STAGE_CACHE_SIZE
+    """
+    names = list(stages)
+    for name in ([from_stage] if from_stage else []) + list(only or []):
+        if name not in stages:
+            raise ValueError(f"Unknown stage {name}, stages are: {', '.join(names)}")
+    if only:
+        targets = [name for name in names if name in only]
+        forced = set(only)
+    else:
+        targets = names
+        forced = set(names[names.index(from_stage):]) if from_stage else set()
+
+    keys = {}
+    cacheable = {}
+    for name in names:
+        stage = stages[name]
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{_CACHE_VERSION};{name};{stage.get('params')!r};{[keys[i] for i in stage['inputs']]}".encode())
+        for code in stage['code']:
+            digest.update(inspect.getsource(code).encode())
+        keys[name] = digest.hexdigest()
+        cacheable[name] = stage.get('cache', True) and all(cacheable[i] for i in stage['inputs'])
+
+    def entry(name):
+        return os.path.join(_STAGE_CACHE_DIR, f"{name}.{keys[name]}")
+
+    def fresh(name):
+        # Whether the result of an earlier run can be used instead of running the stage
+        if name in forced or not cacheable[name] or not os.path.exists(entry(name) + '.json'):
+            return False
+        with open(entry(name) + '.json') as f:
+            recorded = json.load(f)
+        if recorded['value'] and not os.path.exists(entry(name) + '.pkl'):
+            return False
+        return all(_output_stat(path) == stat for path, stat in recorded['outputs'].items())
+
+    values = {}
+
+    def run(name):
+        if name in values:
+            return values[name]
+        stage = stages[name]
+        if fresh(name):
+            click.echo(f"Load unchanged stage {name} from cache")
+            os.utime(entry(name) + '.json')
+            values[name] = _profiled(name, lambda: pd.read_pickle(entry(name) + '.pkl')
+                                     if os.path.exists(entry(name) + '.pkl') else None, status='loaded')
+            return values[name]
+
+        inputs = [run(i) for i in stage['inputs']]
+        click.echo(f"Run stage {name}")
+        rows_in = [_rows(value) for value in inputs]
+        values[name] = _profiled(name, stage['run'], *inputs,
+                                 rows_in=sum(rows_in) if rows_in and None not in rows_in else None)
+        if cacheable[name]:
+            os.makedirs(_STAGE_CACHE_DIR, exist_ok=True)
+            if values[name] is not None:
+                pd.to_pickle(values[name], entry(name) + '.pkl.tmp')
+                os.replace(entry(name) + '.pkl.tmp', entry(name) + '.pkl')
+            with open(entry(name) + '.json', 'w') as f:
+                json.dump({'value': values[name] is not None,
+                           'outputs': {path: _output_stat(path) for path in stage.get('outputs', [])}}, f)
+        return values[name]
+
+    for name in targets:
+        if fresh(name):
+            click.echo(f"Skip unchanged stage {name}")
+            os.utime(entry(name) + '.json')
+            if _profiler is not None:
+                _profiler.skip(name, 'skipped')
+        else:
+            run(name)
+
+    _evict_stage_cache(_STAGE_CACHE_SIZE if cache_size is None else cache_size,
+                       keep={os.path.basename(entry(name)) for name in names})
+
+
+def _output_stat(path):
+    # Size and modification time of a file written by a stage, None if it does not exist
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _evict_stage_cache(cache_size, keep=()):
+    # Remove the least recently used results of stages until the cache fits into cache_size bytes
+    entries = {}
+    for path in glob.glob(os.path.join(_STAGE_CACHE_DIR, '*.*.*')):
+        name = '.'.join(os.path.basename(path).split('.')[:2])
+        size, last_used = entries.get(name, (0, 0))
+        stat = os.stat(path)
+        entries[name] = (size + stat.st_size, max(last_used, stat.st_mtime) if path.endswith('.json') else last_used)
+    total = sum(size for (size, _) in entries.values())
+    for name, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+        if total <= cache_size:
+            break
+        if name in keep:
+            continue
+        for path in glob.glob(os.path.join(_STAGE_CACHE_DIR, f"{name}.*")):
+            os.remove(path)
+        total -= size
+
+
+class Profiler:
+    """
+    Records wall and CPU time, rows in and out, peak memory and the counts of the name resolvers of each stage of a
+    command, see the option '--profile'. One stage can also be run under cProfile.
+    """
+
+    def __init__(self, report, profile_stage=None):
+        """
+        :param report:          string, path to the JSON report, the cProfile statistics are saved next to it
+        :param profile_stage:   None or str, name of the stage to run under cProfile
+        """
+        self.report = report
+        self.profile_stage = profile_stage
+        self.stages = []
+        self._start = (time.perf_counter(), time.process_time())
+
+    def run(self, name, fn, *args, rows_in=None, status='run'):
+        """
+        Run fn with args as stage name and record its measures.
+
+        :param rows_in: None or int, number of rows of the stage's inputs
+        :param status:  str, e.g. 'run' or 'loaded' for stages loaded from a cache
+
+        :return: the value returned by fn
+        """
+        counts = _resolver_counts()
+        profile = cProfile.Profile() if name == self.profile_stage else None
+        with PeakMemory() as memory:
+            wall, cpu = time.perf_counter(), time.process_time()
+            if profile:
+                value = profile.runcall(fn, *args)
+            else:
+                value = fn(*args)
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        rows_out = _rows(value)
+        self.stages.append({
+            'stage': name, 'status': status, 'wall_seconds': wall, 'cpu_seconds': cpu, 'rows_in': rows_in,
+            'rows_out': rows_out,
+            'rows_per_second': (rows_in or rows_out or 0) / wall if wall and (rows_in or rows_out) else None,
+            'peak_rss_bytes': memory.peak, 'resolver': dict(_resolver_counts() - counts),
+        })
+        if profile:
+            path = f"{os.path.splitext(self.report)[0]}.{name}.prof"
+            profile.dump_stats(path)
+            click.echo(f"Saved the cProfile statistics of stage {name} to {path}")
+            pstats.Stats(profile).sort_stats('cumulative').print_stats(20)
+        return value
+
+    def skip(self, name, status):
+        """
+        Record a stage that did not run, e.g. as it did not change.
+        """
+        self.stages.append({'stage': name, 'status': status})
+
+    def save(self, command=None):
+        """
+        Save the JSON report and print a summary table.
+
+        :param command: None or str, name of the profiled command
+        """
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        total = {'wall_seconds': time.perf_counter() - self._start[0],
+                 'cpu_seconds': time.process_time() - self._start[1],
+                 'peak_rss_bytes': usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024),
+                 'resolver': dict(_resolver_counts())}
+        directory = os.path.dirname(self.report)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.report, 'w') as f:
+            json.dump({'command': command, 'total': total, 'stages': self.stages}, f, indent=2)
+
+        table = pd.DataFrame(self.stages + [{'stage': 'total', 'status': '', **total}]).set_index('stage')
+        table['peak_rss_mb'] = table['peak_rss_bytes'] / 2 ** 20
+        resolver = pd.DataFrame([counts if isinstance(counts, dict) else {} for counts in table['resolver']],
+                                index=table.index)
+        table = pd.concat([table.drop(columns=['peak_rss_bytes', 'resolver']), resolver], axis=1)
+        click.echo(table.to_string(na_rep='', float_format='{:.2f}'.format))
+        click.echo(f"Saved the profile to {self.report}")
+
+
+def _profiled(name, fn, *args, rows_in=None, status='run'):
+    # Run a stage with the active profiler, if any
+    if _profiler is None:
+        return fn(*args)
+    return _profiler.run(name, fn, *args, rows_in=rows_in, status=status)
+
+
+def _resolver_counts():
+    counts = collections.Counter()
+    for resolver in GenderResolver._resolvers.values():
+        counts.update(resolver.counts)
+    return counts
+
+
+def _rows(value):
+    # Number of rows of the values stages pass on: frames, cubes and collections of them
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, AuthorshipCube):
+        return len(value.counts)
+    if isinstance(value, (tuple, list, dict)):
+        rows = [_rows(item) for item in (value.values() if isinstance(value, dict) else value)]
+        if rows and all(row is not None for row in rows):
+            return sum(rows)
+    return None
+
+
+class PeakMemory:
+    """
+    Samples the resident set size of this process in a background thread to get the peak of a single stage. Falls back
+    to the peak of the whole process where '/proc' is not available. Memory of worker processes is not included.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._running = False
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = _rss()
+        self._running = True
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._running = False
+        self._thread.join()
+        self.peak = max(self.peak, _rss())
+
+    def _sample(self):
+        while self._running:
+            self.peak = max(self.peak, _rss())
+            time.sleep(self.interval)
+
+
+def _rss():
+    # Resident set size in bytes
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def authorships(field=None, with_accuracy=False, identity_list=None, with_genders=True, gapi_path=None, cache=True,
+                workers=1, with_title=False):
     """
     Constructs a dataframe containing an entry for each authorship found in the submission data of the given field.
     The added columns 'man', 'woman', 'neutral', unknown' contain 1 if the author contains to the category, else 0.
@@ -123,124 +714,593 @@ def authorships(field=None, with_accuracy=False, identity_list=None, with_gender
     'accuracy' if with_accuracy is True. The accuracy is used to build 'f' and 'm' being the probability that the author
     has a female / male name. You can provide an identity_list that contains author with dblp id, name(s), paper(s) and
     the manually identified gender ('man' and 'woman'). This list has priority over the results of the Gender-API.
+    To keep the table small, 'field', 'venue', 'paper_id', 'author_name' and 'author_id' are categories, years and
+    positions are int16, the gender columns are int8 and the accuracy is a nullable float. Titles are only included if
+    with_title is True.
 
     :param field:           string or None, if field is specified, the csv file with that name in the output directory
                             is loaded. If no field is given, all under csv files in output directory are loaded with
                             given file name as the field's name.
     :param with_accuracy:   bool, whether to return the accuracy for the gender
-    :param identity_list:   dataframe
+    :param identity_list:   dataframe, see '_load_identity_list'
     :param with_genders:    bool, whether to add gender to authorships or not
     :param gapi_path:       string, path to file of first names enriched with gender by Gender-API
+    :param cache:           bool, whether to reuse and store the authorships of each input file under '/.cache'. Cached
+                            authorships are only used while the input file and the gender sources are unchanged.
+    :param workers:         int, number of processes to parse and annotate the input files with. Files are split into
+                            chunks of papers, the result is the same as with a single process.
+    :param with_title:      bool, whether to add the papers' titles
 
     :return: dataframe
     """
 
-    # If no field is specified, use them all
-    glob_path = os.path.join('input', '*.csv') if field is None else os.path.join('input', field + '.csv')
     df = []
-    field_was_specified = True if field else False
+    pending = []
+    if with_genders:
+        identity_list = _index_identity_list(identity_list)
+        sources = _gender_sources_digest(identity_list, gapi_path)
 
-    for csv_file in glob.glob(glob_path):
-        data = pd.read_csv(csv_file, usecols=['venue', 'year', 'paper_id', 'title', 'authors'])
-        field = field if field_was_specified else csv_file.replace('input/', '').replace('.csv', '')
+    for csv_file, field in _input_files(field):
+        cache_path = _authorships_cache_path(csv_file, field, sources if with_genders else None) if cache else None
+        if cache_path and os.path.exists(cache_path):
+            df.append(pd.read_feather(cache_path))
+            click.echo(f"Successfully loaded cached authors of {csv_file} of field {field}")
+            continue
+
+        data = _read_input(csv_file)
         click.echo(f"Successfully loaded authors from {csv_file} of field {field}")
-        for _, paper in data.iterrows():
+        # Split large files into chunks of papers, all authors of a paper stay in the same chunk
+        chunks = [(data.iloc[start:start + _INGEST_CHUNK_SIZE], field, with_genders)
+                  for start in range(0, len(data), _INGEST_CHUNK_SIZE)] or [(data, field, with_genders)]
+        pending.append((len(df), cache_path, chunks))
+        df.append(None)
+
+    if not df:
+        pending.append((0, None, [(pd.DataFrame(columns=_INPUT_COLUMNS), field, with_genders)]))
+        df.append(None)
+
+    # Parse and annotate the chunks of all files not found in the cache, results keep the order of the chunks
+    tasks = [task for (_, _, chunks) in pending for task in chunks]
+    results = _run_ingest(tasks, GenderResolver.from_path(gapi_path) if with_genders and tasks else None,
+                          identity_list, workers)
+    for (index, cache_path, chunks) in pending:
+        field_df = pd.concat([next(results) for _ in chunks], ignore_index=True)
+        if cache_path:
+            _write_cache(field_df, cache_path)
+        df[index] = field_df
+
+    df = pd.concat(df, ignore_index=True)
+    if with_genders:
+        df['accuracy'] = df['accuracy'].astype('Float64') if with_accuracy else pd.NA
+        click.echo('Successfully infered the genders!')
+    else:
+        df['man'] = df['woman'] = df['neutral'] = 0
+        df['unknown'] = 1
+        df['accuracy'] = pd.NA
 
-            # Skip papers without authors
-            if pd.isna(paper.authors):
-                continue
+    return _compact_authorships(df, with_genders, with_title)
+
+
+def _compact_authorships(df, with_genders, with_title):
+    """
+    Convert authorships to the compact schema returned by 'authorships': categories for the repeated strings, small
+    integers for years, positions and genders and a nullable float accuracy.
+    """
+    columns = _AUTHORSHIP_COLUMNS + ['accuracy'] + (['f', 'm'] if with_genders else []) + ['author_position_last']
+    if not with_title:
+        columns.remove('title')
+    return df[columns].astype({
+        'field': 'category',
+        'venue': 'category',
+        'year': np.int16,
+        'paper_id': 'category',
+        'author_position': np.int16,
+        'author_name': 'category',
+        'author_id': 'category',
+        'man': np.int8,
+        'woman': np.int8,
+        'neutral': np.int8,
+        'unknown': np.int8,
+        'accuracy': 'Float64',
+        'author_position_last': np.int16,
+    })
+
+
+def paper_titles():
+    """
+    Read only the titles of the papers in the input files, so they can be added to exported authorships without keeping
+    them in the analysed table.
+
+    :return:    pd.Series of the titles indexed by paper_id
+    """
+    titles = [pd.read_feather(input_file, columns=['paper_id', 'title']) if input_file.endswith('.feather') else
+              pd.read_csv(input_file, usecols=['paper_id', 'title']) for input_file, _ in _input_files()]
+    titles = pd.concat(titles, ignore_index=True) if titles else pd.DataFrame(columns=['paper_id', 'title'])
+    return titles.drop_duplicates('paper_id').set_index('paper_id')['title']
+
+
+def _input_files(field=None):
+    """
+    :param field:   string or None, name of a single field to load, default: all fields
+    :return:        list of tuples of the path of a csv or feather file under '/input' and the name of its field
+    """
+    # If no field is specified, use them all
+    pattern = '*' if field is None else field
+    input_files = sorted(glob.glob(os.path.join('input', pattern + '.csv')) +
+                         glob.glob(os.path.join('input', pattern + '.feather')))
+    return [(input_file, os.path.splitext(os.path.basename(input_file))[0]) for input_file in input_files]
 
-            venue = paper.venue
-            authors = paper.authors.split('; ')
-            for (index, author_info) in enumerate(authors):
-                # Start author indexes at 1
-                index += 1
-
-                # Initialize a new data point
-                datum = collections.OrderedDict(
-                    field=field,
-                    venue=venue,
-                    year=int(paper.year),
-                    paper_id=paper.paper_id,
-                    title=paper.title,
-                    author_position=None,
-                    author_name=None,
-                    author_id=None,
-                    man=0,
-                    woman=0,
-                    neutral=0,
-                    unknown=0,
-                    accuracy=None
-                )
-                datum['author_position'] = index
-
-                # Extract the author name and ID
-                author_info = author_info.split(': ')
-                author_id = author_info[0]
-                author_name = author_info[1]
-
-                # Remove numerical suffixes
-                author_name = author_name.rstrip(' 0123456789')
-                # Parse XHTML's apostrophe and quotes
-                author_name = author_name.replace('&apos;', "'")
-                author_name = author_name.replace('&quot;', '')
-
-                datum['author_name'] = author_name
-                datum['author_id'] = author_id
-                gender = None
-
-                if with_genders:
-                    # Check if we know the gender of the person if desired
-                    if identity_list is not None and not identity_list.empty:
-                        known_identity = identity_list.loc[identity_list['author_id'] == datum['author_id']]
-                        if len(known_identity) > 1:
-                            click.echo(f"WARNING: More than one identity found for {datum['author_id']} in ")
-                        if len(known_identity) == 1:
-                            if known_identity.iloc[0]['woman'] == 1:
-                                gender = 'woman'
-                                f = 1.0
-                                m = 0.0
-                            elif known_identity.iloc[0]['man'] == 1:
-                                gender = 'man'
-                                f = 0.0
-                                m = 1.0
-
-                    if gender is None:
-                        # Attempt to predict gender with GenderAPI's results
-                        f = m = 0.0
-                        if with_accuracy:
-                            gender, accuracy = gapi_gender(author_name, gapi_path, with_accuracy=with_accuracy)
-                        else:
-                            gender = gapi_gender(author_name, gapi_path, with_accuracy=with_accuracy)
-                        if gender == 'woman':
-                            f = accuracy / 100
-                            m = (100 - accuracy) / 100
-                        if gender == 'man':
-                            m = accuracy / 100
-                            f = (100 - accuracy) / 100
-                        if gender == 'neutral':
-                            f = m = 0.5
-                        datum['f'] = f
-                        datum['m'] = m
-                        if gender is None:
-                            gender = 'unknown'
-
-                    datum[gender] += 1
-                    datum['accuracy'] = accuracy if accuracy else ''
-
-                else:
-                    datum['unknown'] = 1
-
-                df.append(datum)
-
-    df = pd.DataFrame(df)
-    # Find index of the last author of each paper and add it as column
-    last_author_index = df.groupby(['paper_id'], sort=False)['author_position'].max().to_frame()
-    df = df.join(last_author_index, on='paper_id', rsuffix='_last')
 
+def _read_input(input_file):
+    # Feather files written by 'ingest_dblp_xml' already contain parsed authorships
+    if input_file.endswith('.feather'):
+        return pd.read_feather(input_file)
+    return pd.read_csv(input_file, usecols=_INPUT_COLUMNS)
+
+
+def stream_authorship_counts(gapi_path, identity_list=None, seed=None, chunksize=None, woman_ratio=None):
+    """
+    Read the csv files given in '/input' in chunks of papers, enrich the authorships with gender and fold them into
+    a cube of counts of papers per field, venue and year. Only a single chunk of authorships is held in memory at a
+    time.
+    The gender of unknown and neutral authors is assumed from a seeded hash of their author_id, so every author gets the
+    same gender in all chunks. The ratio of woman among the authors with known gender is estimated in a first pass over
+    the input if it is not given.
+
+    :param gapi_path:       path, both a file or a directory is accepted
+    :param identity_list:   pd.DataFrame, see '_load_identity_list'
+    :param seed:            None or int, seed for assuming the gender of unknown and neutral names
+    :param chunksize:       int or None, number of papers per chunk, default: _INGEST_CHUNK_SIZE
+    :param woman_ratio:     float or None, ratio of woman among the authors with known gender
+    :return:                tuple of
+                            - AuthorshipCube of the counted papers, the number of unique authors is estimated
+                            - set of the names with unknown gender
+    """
+    identity_list = _index_identity_list(identity_list)
+    resolver = GenderResolver.from_path(gapi_path)
+    chunksize = chunksize or _INGEST_CHUNK_SIZE
+    hash_key = _hash_key(seed)
+
+    if woman_ratio is None:
+        woman_authors = HyperLogLog()
+        man_authors = HyperLogLog()
+        for df in _stream_authorships(identity_list, resolver, chunksize):
+            woman_authors.update(df.loc[df['woman'] == 1, 'author_id'])
+            man_authors.update(df.loc[df['man'] == 1, 'author_id'])
+        woman_ratio = woman_authors.count() / (woman_authors.count() + man_authors.count())
+
+    cube = None
+    unknown_names = set()
+    for df in _stream_authorships(identity_list, resolver, chunksize):
+        unknown_names.update(df.loc[df['unknown'] == 1, 'author_name'])
+
+        # Assume the gender of unknown and neutral authors and count the papers with a woman at each position
+        uncertain = ((df['unknown'] == 1) | (df['neutral'] == 1)).to_numpy()
+        is_woman = pd.util.hash_array(df.loc[uncertain, 'author_id'].to_numpy(dtype=object), hash_key=hash_key) \
+            / 2 ** 64 <= woman_ratio
+        df.loc[uncertain, 'woman'] = is_woman.astype(np.int8)
+        df.loc[uncertain, 'man'] = (~is_woman).astype(np.int8)
+        chunk_cube = AuthorshipCube.from_authorships(df)
+        cube = chunk_cube if cube is None else cube.merge(chunk_cube)
+
+    return cube, unknown_names
+
+
+def _stream_authorships(identity_list, resolver, chunksize):
+    # Yield the gender-enriched authorships of all input files chunk by chunk
+    for input_file, field in _input_files():
+        click.echo(f"Streaming authors from {input_file} of field {field}")
+        if input_file.endswith('.feather'):
+            with pa.ipc.open_file(input_file) as reader:
+                for i in range(reader.num_record_batches):
+                    yield _annotate_genders(reader.get_batch(i).to_pandas(), identity_list, resolver)
+        else:
+            for data in pd.read_csv(input_file, usecols=_INPUT_COLUMNS, chunksize=chunksize):
+                yield _annotate_genders(_parse_authorships(data, field), identity_list, resolver)
+
+
+def append_authorships(gapi_path, identity_list=None, seed=None, workers=1):
+    """
+    Add the authorships of new years to the gender-enriched authorships, the cube and the statistics kept under
+    '.cache/incremental' by the last call instead of processing all years again. The rows of the input files are
+    hashed per field, venue and year. Only the authorships of new or changed (venue, year) rows are parsed and
+    annotated, rows removed from the input are dropped. The statistics of the affected venues are computed again.
+    Everything is processed again if the gender sources or the seed changed.
+    The gender of unknown and neutral authors is assumed from a seeded hash of their author_id as in
+    'stream_authorship_counts'. The assumed gender of authors seen before is kept, even if the ratio of woman among
+    the authors with known gender changes with the new years.
+
+    :param gapi_path:       path, both a file or a directory is accepted
+    :param identity_list:   pd.DataFrame, see '_load_identity_list'
+    :param seed:            None or int, seed for assuming the gender of unknown and neutral names
+    :param workers:         int, number of processes to parse and annotate the new authorships with
+    :return:                tuple of
+                            - pd.DataFrame of all gender-enriched authorships, see 'authorships'
+                            - AuthorshipCube of all authorships with assumed genders
+                            - pd.DataFrame of the statistics per venue, see '_venue_statistics'
+    """
+    identity_list = _index_identity_list(identity_list)
+    sources = _gender_sources_digest(identity_list, gapi_path)
+    state_path = os.path.join(_INCREMENTAL_DIR, 'state.json')
+    state = None
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+        if (state['version'], state['sources'], state['seed']) != (_CACHE_VERSION, sources, seed):
+            click.echo('The gender sources or the seed changed, process all years again')
+            state = None
+    stored_cells = {} if state is None else {tuple(cell[:3]): cell[3] for cell in state['cells']}
+
+    # Hash the rows of each (venue, year) of the input files and parse and annotate the new or changed ones
+    cells = {}
+    tasks = []
+    for input_file, field in _input_files():
+        data = _read_input(input_file)
+        keys = pd.MultiIndex.from_arrays([data['venue'].astype(str), data['year'].astype(int)])
+        digests = pd.util.hash_pandas_object(data, index=False).groupby(keys).sum()
+        changed = [key for key, digest in digests.items() if stored_cells.get((field, *key)) != str(digest)]
+        cells.update({(field, venue, int(year)): str(digest) for (venue, year), digest in digests.items()})
+        if changed:
+            data = data[keys.isin(changed)]
+            click.echo(f"Found {len(changed)} new or changed venue years in {input_file} of field {field}")
+            tasks.extend((data.iloc[start:start + _INGEST_CHUNK_SIZE], field, True)
+                         for start in range(0, len(data), _INGEST_CHUNK_SIZE))
+    outdated = [cell for cell, digest in stored_cells.items() if cells.get(cell) != digest]
+    added = [cell for cell, digest in cells.items() if stored_cells.get(cell) != digest]
+
+    tasks = tasks or [(pd.DataFrame(columns=_INPUT_COLUMNS), None, True)]
+    new = pd.concat(_run_ingest(tasks, GenderResolver.from_path(gapi_path), identity_list, workers), ignore_index=True)
+    new = _compact_authorships(new, True, False)
+
+    if state is None:
+        df = new
+        assignments = pd.Series([], index=pd.Index([], name='author_id', dtype=object), dtype=bool, name='woman')
+        cube = None
+        statistics = None
+    else:
+        df = pd.read_feather(os.path.join(_INCREMENTAL_DIR, 'authorships.feather'))
+        df = df[~_cells_of(df).isin(outdated)]
+        if len(new):
+            df = _compact_authorships(pd.concat([df, new], ignore_index=True), True, False)
+        assignments = pd.read_feather(os.path.join(_INCREMENTAL_DIR, 'assignments.feather')).set_index(
+            'author_id')['woman']
+        cube = AuthorshipCube.load(os.path.join(_INCREMENTAL_DIR, 'cube.feather'))
+        keep = ~_cells_of(cube.counts.index.to_frame(index=False)).isin(outdated)
+        cube = cube.take(np.asarray(keep))
+        statistics = pd.read_pickle(os.path.join(_INCREMENTAL_DIR, 'statistics.pkl'))
+
+    # Keep the assumed gender of authors seen before and assume it for new authors
+    uncertain = (df['unknown'] == 1) | (df['neutral'] == 1)
+    unseen = pd.Index(df.loc[uncertain, 'author_id'].astype(str).unique()).difference(assignments.index)
+    if len(unseen):
+        is_woman = pd.util.hash_array(unseen.to_numpy(dtype=object), hash_key=_hash_key(seed)) / 2 ** 64 \
+            <= _woman_ratio(df)
+        assignments = pd.concat([assignments, pd.Series(is_woman, index=unseen, name='woman')])
+        assignments.index.name = 'author_id'
+
+    if len(new):
+        new_cube = AuthorshipCube.from_authorships(_assume_gender_assigned(new, assignments))
+        cube = new_cube if cube is None else cube.merge(new_cube)
+    elif cube is None:
+        cube = AuthorshipCube.from_authorships(_assume_gender_assigned(df, assignments))
+
+    venues = {venue for (_, venue, _) in outdated + added}
+    if statistics is None or venues:
+        updated = _venue_statistics(df[df['venue'].isin(venues)] if statistics is not None else df)
+        updated.index = updated.index.astype(str)
+        statistics = updated if statistics is None else \
+            pd.concat([statistics.drop(index=list(venues), errors='ignore'), updated]).sort_index()
+    click.echo(f"Added {len(new)} authorships of {len(added)} venue years, dropped {len(outdated)} venue years")
+
+    # The state is written last, so an interrupted run is processed again
+    os.makedirs(_INCREMENTAL_DIR, exist_ok=True)
+    df.reset_index(drop=True).to_feather(os.path.join(_INCREMENTAL_DIR, 'authorships.feather'))
+    assignments.reset_index().to_feather(os.path.join(_INCREMENTAL_DIR, 'assignments.feather'))
+    cube.save(os.path.join(_INCREMENTAL_DIR, 'cube.feather'))
+    pd.to_pickle(statistics, os.path.join(_INCREMENTAL_DIR, 'statistics.pkl'))
+    with open(state_path + '.tmp', 'w') as f:
+        json.dump({'version': _CACHE_VERSION, 'sources': sources, 'seed': seed,
+                   'cells': [[*cell, digest] for cell, digest in cells.items()]}, f)
+    os.replace(state_path + '.tmp', state_path)
+    return df, cube, statistics
+
+
+def _cells_of(df):
+    # The (field, venue, year) of each row as a pd.MultiIndex of plain labels
+    return pd.MultiIndex.from_arrays([df['field'].astype(str), df['venue'].astype(str), df['year'].astype(int)])
+
+
+def _hash_key(seed):
+    # Derive the 16 character key for pd.util.hash_array from the seed, a random key is used without seed
+    seed = os.urandom(8).hex() if seed is None else seed
+    return hashlib.blake2b(str(seed).encode(), digest_size=8).hexdigest()
+
+
+def _run_ingest(tasks, resolver, identity_list, workers):
+    # Run '_ingest_chunk' on all tasks, in worker processes if desired, and yield the authorships in order of the tasks
+    pooled = workers > 1 and len(tasks) > 1
+    if pooled:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_ingest_worker,
+                                                    initargs=(resolver, identity_list)) as executor:
+            results = list(executor.map(_ingest_chunk, tasks))
+        if resolver is not None:
+            for (_, counts) in results:
+                resolver.counts.update(counts)
+    else:
+        _init_ingest_worker(resolver, identity_list)
+        results = (_ingest_chunk(task) for task in tasks)
+    for (df, _) in results:
+        yield df
+
+
+def _init_ingest_worker(resolver, identity_list):
+    # Share the name resolver and the identity index with all chunks handled by this process
+    global _ingest_worker_state
+    _ingest_worker_state = {'resolver': resolver, 'identity_list': identity_list}
+
+
+def _ingest_chunk(task):
+    # Parse a chunk of papers of a single field and annotate the genders if desired, the counts of the resolver are
+    # returned as they are lost in worker processes
+    data, field, with_genders = task
+    df = data if 'author_position' in data.columns else _parse_authorships(data, field)
+    counts = collections.Counter()
     if with_genders:
-        click.echo('Successfully infered the genders!')
-    return df
+        resolver = _ingest_worker_state['resolver']
+        before = collections.Counter(resolver.counts)
+        df = _annotate_genders(df, _ingest_worker_state['identity_list'], resolver)
+        counts = resolver.counts - before
+    return df, counts
+
+
+def _annotate_genders(df, identity_list, resolver):
+    """
+    Add the columns 'man', 'woman', 'neutral', 'unknown', 'accuracy', 'f' and 'm' to parsed authorships. See method
+    'authorships' for more details.
+
+    :param df:              pd.DataFrame, as returned by '_parse_authorships'
+    :param identity_list:   pd.DataFrame, as returned by '_index_identity_list'
+    :param resolver:        GenderResolver
+    :return:                pd.DataFrame
+    """
+    # Attempt to predict gender with GenderAPI's results once per distinct name
+    genders = resolver.resolve(df['author_name'].unique())
+    df = df.join(genders, on='author_name')
+
+    # Check if we know the gender of the person if desired, this has priority over the Gender-API
+    known_gender = df['author_id'].map(identity_list['gender'])
+    is_known = known_gender.notna()
+    df['gender'] = df['gender'].where(~is_known, known_gender).fillna('unknown')
+    df['accuracy'] = pd.to_numeric(df['accuracy'].where(~is_known, None)).astype('Float64')
+    for gender in ['man', 'woman', 'neutral', 'unknown']:
+        df[gender] = (df['gender'] == gender).astype(np.int8)
+
+    # The accuracy is used to build the probability of the author having a female / male name
+    accuracy = df['accuracy'].astype(float).where(~is_known, 100)
+    genders = [df['woman'] == 1, df['man'] == 1, df['neutral'] == 1]
+    df['f'] = np.select(genders, [accuracy / 100, (100 - accuracy) / 100, 0.5], 0.0)
+    df['m'] = np.select(genders, [(100 - accuracy) / 100, accuracy / 100, 0.5], 0.0)
+    return df.drop(columns=['gender'])
+
+
+def ingest_dblp_xml(source, venues, destination, person_ids=True, batch_size=None):
+    """
+    Stream-parse a dblp XML dump (plain or gzipped) and write the authorships of all papers of the venues given in the
+    venue mapping file to one feather file per field under destination. The files contain the same columns as
+    '_parse_authorships' returns and are picked up by 'authorships' like the csv files if written to '/input'. Records
+    are cleared as soon as they are processed and authorships are written in batches, so memory does not grow with the
+    size of the dump.
+
+    :param source:      string, path to dblp.xml or dblp.xml.gz
+    :param venues:      string, path to a csv file with the columns 'toc', 'venue' and 'field'. 'toc' is a regular
+                        expression that the path of the table of contents in a paper's url has to match, e.g.
+                        'conf/chi/chi2019' or 'conf/sigmod/sigmod\\d+'. Companion and workshop proceedings under the
+                        same key prefix have other tables of contents and are left out.
+    :param destination: string, path to the directory for the feather files
+    :param person_ids:  bool, whether to use dblp's person ids (e.g. '68/1959') as author_id like the csv files do. This
+                        needs a first pass over the dump to map names to the ids of the persons' home pages, the mapping
+                        is kept in an SQLite file under .cache/dblp until the dump changes. Otherwise,
+                        and for authors without a home page, dblp's unique name of a person (e.g. 'Kai Li 0001') is
+                        used, the number of such authors is reported.
+    :param batch_size:  int or None, number of authorships per written batch, default: _INGEST_CHUNK_SIZE
+    :return:            dict of the number of authorships written per field
+    """
+    venues_by_directory = _load_dblp_venues(venues)
+    persons = _dblp_person_store(source) if person_ids else None
+    batch_size = batch_size or _INGEST_CHUNK_SIZE
+    os.makedirs(destination, exist_ok=True)
+
+    writers = {}
+    batches = {}
+    counts = collections.Counter()
+    unidentified = set()
+    try:
+        for record in _iter_dblp_records(source, _DBLP_PAPER_TAGS):
+            toc = _dblp_toc(record.findtext('url'))
+            venue_field = _dblp_venue(venues_by_directory, toc) if toc else None
+            authors = [author.text or '' for author in record.findall('author')]
+            year = record.findtext('year')
+            # Skip papers of other venues and papers without authors
+            if venue_field is None or not authors or not year:
+                continue
+
+            venue, field = venue_field
+            title = record.find('title')
+            # The link to the record on the page of its proceedings or journal volume as in the csv files
+            paper_id = f"https://dblp.org/db/{toc}.html#{record.get('key', '')}"
+            title = ''.join(title.itertext()) if title is not None else None
+            batch = batches.setdefault(field, {column: [] for column in _DBLP_SCHEMA.names})
+            for (position, name) in enumerate(authors, start=1):
+                batch['field'].append(field)
+                batch['venue'].append(venue)
+                batch['year'].append(int(year))
+                batch['paper_id'].append(paper_id)
+                batch['title'].append(title)
+                batch['author_position'].append(position)
+                # Remove numerical suffixes and quotes as for the csv files
+                batch['author_name'].append(name.rstrip(' 0123456789').replace('"', ''))
+                # Names are replaced by the person ids when the batch is written
+                batch['author_id'].append(name)
+                batch['author_position_last'].append(len(authors))
+            counts[field] += len(authors)
+
+            if len(batch['author_position']) >= batch_size:
+                _write_dblp_batch(writers, batches.pop(field), field, destination, persons, unidentified)
+
+        for (field, batch) in batches.items():
+            _write_dblp_batch(writers, batch, field, destination, persons, unidentified)
+    finally:
+        for writer in writers.values():
+            writer.close()
+        if persons is not None:
+            persons.close()
+
+    for field in writers:
+        path = os.path.join(destination, field + '.feather')
+        os.replace(path + '.tmp', path)
+    if person_ids and unidentified:
+        click.echo(f"WARNING: {len(unidentified)} authors have no dblp home page, their names are used as author_id")
+    return dict(counts)
+
+
+def _load_dblp_venues(path):
+    # Compile the table of contents patterns of the venue mapping and group them by their directory, e.g. 'conf/chi',
+    # so that only few patterns are tried per record
+    venues_by_directory = collections.defaultdict(list)
+    mapping = pd.read_csv(path)
+    for (toc, venue, field) in mapping[['toc', 'venue', 'field']].itertuples(index=False):
+        toc = toc.strip('/')
+        venues_by_directory[toc.rpartition('/')[0]].append((re.compile(toc), venue, field))
+    return venues_by_directory
+
+
+def _dblp_toc(url):
+    """
+    :param url: string or None, a record's url relative to dblp, e.g. 'db/conf/sigmod/sigmod2019.html#AbedjanGNS19'
+    :return:    string, path of the table of contents of the record's proceedings or journal volume, e.g.
+                'conf/sigmod/sigmod2019', or None for records without one
+    """
+    page = (url or '').partition('#')[0]
+    if page.startswith('db/') and page.endswith('.html'):
+        return page[len('db/'):-len('.html')]
+    return None
+
+
+def _dblp_venue(venues_by_directory, toc):
+    # Venue and field of the first pattern that matches the whole table of contents path
+    for (pattern, venue, field) in venues_by_directory.get(toc.rpartition('/')[0], ()):
+        if pattern.fullmatch(toc):
+            return venue, field
+    return None
+
+
+def _iter_dblp_records(source, tags):
+    # Yield the records with the given tags of a dblp XML dump one by one and drop them from the tree afterwards
+    opener = gzip.open if source.endswith('.gz') else open
+    with opener(source, 'rb') as f:
+        # dblp.dtd declares the HTML entities used in names and titles
+        parser = ET.XMLParser()
+        parser.entity.update(_DBLP_ENTITIES)
+        context = ET.iterparse(f, events=('start', 'end'), parser=parser)
+        _, root = next(context)
+        for (event, element) in context:
+            if event == 'end' and element.tag in _DBLP_RECORD_TAGS:
+                if element.tag in tags:
+                    yield element
+                root.clear()
+
+
+def _dblp_person_store(source):
+    """
+    Map all names of a person to the id of the person's home page, e.g. 'homepages/68/1959', in an SQLite file under
+    .cache/dblp. The file is only built again if the dump changed, its rows are inserted while the dump is parsed, so
+    memory does not grow with the number of persons.
+
+    :param source:  string, path to dblp.xml or dblp.xml.gz
+    :return:        sqlite3.Connection to the file with the table 'persons' of names and person ids
+    """
+    stat = os.stat(source)
+    digest = hashlib.blake2b(f"{os.path.abspath(source)};{stat.st_size};{stat.st_mtime_ns}".encode(),
+                             digest_size=8).hexdigest()
+    path = os.path.join(_DBLP_CACHE_DIR, f"persons.{digest}.sqlite")
+    if not os.path.exists(path):
+        os.makedirs(_DBLP_CACHE_DIR, exist_ok=True)
+        for outdated in glob.glob(os.path.join(_DBLP_CACHE_DIR, 'persons.*')):
+            os.remove(outdated)
+        connection = sqlite3.connect(path + '.tmp')
+        with connection:
+            connection.execute("CREATE TABLE persons (name TEXT PRIMARY KEY, person_id TEXT)")
+            connection.executemany("INSERT OR REPLACE INTO persons VALUES (?, ?)", _iter_dblp_person_names(source))
+        connection.close()
+        os.replace(path + '.tmp', path)
+    return sqlite3.connect(path)
+
+
+def _iter_dblp_person_names(source):
+    # Yield the names and the person id of each home page record
+    for record in _iter_dblp_records(source, {'www'}):
+        key = record.get('key', '')
+        if key.startswith('homepages/'):
+            for author in record.findall('author'):
+                yield author.text or '', key[len('homepages/'):]
+
+
+def _write_dblp_batch(writers, batch, field, destination, persons, unidentified):
+    # Replace the names in author_id by the person ids, names without a home page are kept and added to unidentified
+    if persons is not None:
+        names = list(set(batch['author_id']))
+        person_ids = {}
+        # SQLite limits the number of parameters of a statement
+        for start in range(0, len(names), GenderStore._LOOKUP_CHUNK_SIZE):
+            chunk = names[start:start + GenderStore._LOOKUP_CHUNK_SIZE]
+            person_ids.update(persons.execute(
+                f"SELECT name, person_id FROM persons WHERE name IN ({','.join('?' * len(chunk))})", chunk))
+        unidentified.update(name for name in names if name not in person_ids)
+        batch['author_id'] = [person_ids.get(name, name) for name in batch['author_id']]
+    if field not in writers:
+        writers[field] = pa.ipc.new_file(os.path.join(destination, field + '.feather.tmp'), _DBLP_SCHEMA)
+    writers[field].write_batch(pa.record_batch(batch, schema=_DBLP_SCHEMA))
+
+
+def _parse_authorships(data, field):
+    """
+    Explode the papers of a single input file into one row per authorship with whole-column string operations.
+    The 'authors' column holds entries like 'id: name; id: name', the position of an author is given by the order.
+
+    :param data:    pd.DataFrame, containing the columns 'venue', 'year', 'paper_id', 'title' and 'authors'
+    :param field:   string, name of the field the papers belong to
+
+    :return: pd.DataFrame with the columns 'field', 'venue', 'year', 'paper_id', 'title', 'author_position',
+             'author_name', 'author_id' and 'author_position_last'
+    """
+    # Skip papers without authors
+    data = data[data['authors'].notna()].reset_index(drop=True)
+
+    authors = data['authors'].str.split('; ')
+    author_count = authors.str.len()
+    authors = authors.explode()
+
+    # Extract the author name and ID
+    author_info = authors.str.split(': ')
+    author_id = author_info.str[0]
+    # Remove numerical suffixes and parse XHTML's apostrophe and quotes
+    author_name = author_info.str[1].str.rstrip(' 0123456789') \
+                                    .str.replace('&apos;', "'", regex=False) \
+                                    .str.replace('&quot;', '', regex=False)
+
+    papers = data.loc[authors.index]
+    return pd.DataFrame({
+        'field': field,
+        'venue': papers['venue'].to_numpy(),
+        'year': papers['year'].astype(int).to_numpy(),
+        'paper_id': papers['paper_id'].to_numpy(),
+        'title': papers['title'].to_numpy(),
+        # Start author indexes at 1
+        'author_position': authors.groupby(level=0).cumcount().to_numpy() + 1,
+        'author_name': author_name.to_numpy(),
+        'author_id': author_id.to_numpy(),
+        'author_position_last': author_count.loc[authors.index].to_numpy(),
+    })
 
 
 def gapi_gender(author_name, gapi_path, with_accuracy=False):
@@ -255,36 +1315,632 @@ def gapi_gender(author_name, gapi_path, with_accuracy=False):
 
     :return: string or tuple of string and float, the gender is either 'woman', 'man', 'neutral' or None
     """
+    gender, accuracy = GenderResolver.from_path(gapi_path).resolve_name(author_name)
+    return (gender, accuracy) if with_accuracy else gender
 
-    # Load the list of first names with Gender-API once
-    if not hasattr(gapi_gender, 'genders_by_gapi'):
-        gapi_gender.genders_by_gapi = _load_gapi_list(gapi_path)
-        print("Load the gender-enriched name list")
 
-    # Can't determine if this is just the first or just the last name
-    if len(author_name.split(" ")) == 1:
-        return None, None if with_accuracy else None
+class HyperLogLog:
+    """
+    Sketch to estimate the number of distinct values in constant memory, the relative error of the estimate is about
+    1.04 / sqrt(2 ** precision).
+    """
 
-    first_name = author_name.split(" ")[0].strip("()'\"")
-    entry = gapi_gender.genders_by_gapi.query('first_name == @first_name')
-    if entry.empty or pd.isnull(entry['ga_gender'].values[0]):
-        # Check for middle names
-        result = gapi_gender(" ".join(author_name.split(" ")[1:]), gapi_path, with_accuracy=with_accuracy)
-        return result
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
 
-    else:
-        gender = entry['ga_gender'].values[0]
-        accuracy = entry['ga_accuracy'].values[0]
+    def update(self, values):
+        """
+        :param values:  iterable of hashable values, e.g. a pd.Series of author IDs
+        :return:        HyperLogLog, the updated sketch
+        """
+        index, rank = self.hash(values, self.precision)
+        np.maximum.at(self.registers, index, rank)
+        return self
 
-        if accuracy == 50 or gapi_gender == 'unknown':
+    @staticmethod
+    def hash(values, precision):
+        """
+        :param values:      iterable of hashable values
+        :param precision:   int, precision of the sketch
+        :return:            tuple of the register and the rank of each value
+        """
+        hashes = pd.util.hash_array(np.asarray(values, dtype=object))
+        bits = 64 - precision
+        index = (hashes >> np.uint64(bits)).astype(np.intp)
+        # Position of the leftmost 1-bit in the remaining bits of the hash
+        rank = bits + 1 - np.frexp((hashes & np.uint64((1 << bits) - 1)).astype(np.float64))[1]
+        return index, rank.astype(np.uint8)
+
+    def count(self):
+        """
+        :return: int, estimated number of distinct values
+        """
+        return int(self.estimate(self.registers))
+
+    @staticmethod
+    def estimate(registers):
+        """
+        :param registers:   np.ndarray, registers of one sketch or of one sketch per row
+        :return:            estimated number of distinct values, one per row for two-dimensional registers
+        """
+        return HyperLogLog._estimate(registers.shape[-1], np.sum(np.exp2(-registers.astype(np.float64)), axis=-1),
+                                     np.count_nonzero(registers == 0, axis=-1))
+
+    @staticmethod
+    def estimate_sparse(sketches, ranks, count, precision):
+        """
+        :param sketches:    np.ndarray of int, the sketch of each non-zero register, at most one per sketch and register
+        :param ranks:       np.ndarray of uint8, the rank of each non-zero register
+        :param count:       int, number of sketches
+        :param precision:   int, precision of the sketches
+        :return:            np.ndarray, estimated number of distinct values per sketch, the same as of dense registers
+        """
+        m = 1 << precision
+        nonzero = np.bincount(sketches, minlength=count)
+        total = np.bincount(sketches, weights=np.exp2(-ranks.astype(np.float64)), minlength=count) + (m - nonzero)
+        return HyperLogLog._estimate(m, total, m - nonzero)
+
+    @staticmethod
+    def _estimate(m, total, zeros):
+        # Raw estimate from the sum of 2 ** -rank over all m registers
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / total
+        # Use linear counting for small cardinalities
+        linear = m * np.log(m / np.maximum(zeros, 1))
+        return np.round(np.where((estimate <= 2.5 * m) & (zeros > 0), linear, estimate)).astype(np.int64)
+
+
+class AuthorshipCube:
+    """
+    Additive counters of the papers per field, venue and year: the number of papers and of papers with a woman as first,
+    last, any and all authors, and a HyperLogLog sketch of the authors per cell. Views on any selection of fields and
+    venues are answered by summing the cells, the number of authors by merging their sketches. Cubes of disjoint
+    authorships, e.g. chunks of papers, can be merged.
+
+    The sketches are sparse, only the non-zero registers of each cell are kept as a key (the row of the cell in counts
+    times 2 ** precision plus the register) sorted with the register's rank. Most cells have far fewer authors than
+    registers, so a cell takes a few bytes per author instead of 2 ** precision bytes.
+    """
+    KEYS = ['field', 'venue', 'year']
+    COUNTERS = ['papers', 'first', 'last', 'any', 'all']
+
+    def __init__(self, counts, keys, ranks, precision=14):
+        """
+        :param counts:      pd.DataFrame indexed by field, venue and year with a column per counter
+        :param keys:        np.ndarray of int64, sorted keys of the non-zero registers of the authors' sketches
+        :param ranks:       np.ndarray of uint8, rank of each key's register
+        :param precision:   int, precision of the authors' sketches
+        """
+        self.counts = counts
+        self.keys = keys
+        self.ranks = ranks
+        self.precision = precision
+
+    @staticmethod
+    def _max_per_key(keys, ranks):
+        # Sorted distinct keys with the maximum rank of each
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        ranks = ranks[order]
+        if not len(keys):
+            return keys.astype(np.int64), ranks.astype(np.uint8)
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+        return keys[starts].astype(np.int64), np.maximum.reduceat(ranks, starts).astype(np.uint8)
+
+    @classmethod
+    def from_authorships(cls, df, precision=14):
+        """
+        :param df:          pd.DataFrame, containing authorships with genders of all authors assumed, see
+                            '_assume_gender_weighted'
+        :param precision:   int, precision of the authors' sketches
+        :return:            AuthorshipCube
+        """
+        papers = _woman_by_paper(df, ['paper_id'] + cls.KEYS, {'first', 'last', 'any', 'all'})
+        counts = papers.groupby(cls.KEYS, observed=True).agg(
+            papers=('first', 'size'), first=('first', 'sum'), last=('last', 'sum'), any=('any', 'sum'),
+            all=('all', 'sum')).astype(np.int64)
+        # Plain labels, so cubes with different categories can be merged
+        counts.index = pd.MultiIndex.from_frame(counts.index.to_frame(index=False).astype(
+            {'field': object, 'venue': object, 'year': np.int64}))
+
+        # The groups are in the same order as the rows of counts
+        cells = df.groupby(cls.KEYS, observed=True).ngroup().to_numpy().astype(np.int64)
+        index, rank = HyperLogLog.hash(df['author_id'], precision)
+        return cls(counts, *cls._max_per_key((cells << precision) + index, rank), precision=precision)
+
+    def merge(self, other):
+        """
+        Add the counters and sketches of other to this cube, only the cells and registers of other are added, no dense
+        registers are allocated.
+
+        :param other:   AuthorshipCube, of authorships not contained in this cube and with the same precision
+        :return:        AuthorshipCube, this cube
+        """
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge cubes of precision {self.precision} and {other.precision}")
+        added = other.counts.index.difference(self.counts.index)
+        if len(added):
+            # New cells are appended, so the keys of the existing cells stay valid
+            self.counts = pd.concat([self.counts, pd.DataFrame(0, index=added, columns=self.counts.columns)])
+        rows = self.counts.index.get_indexer(other.counts.index)
+        self.counts.iloc[rows] = self.counts.iloc[rows].to_numpy() + other.counts.to_numpy()
+
+        mask = (1 << self.precision) - 1
+        keys = (rows[other.keys >> self.precision].astype(np.int64) << self.precision) + (other.keys & mask)
+        self.keys, self.ranks = self._max_per_key(np.concatenate([self.keys, keys]),
+                                                  np.concatenate([self.ranks, other.ranks]))
+        return self
+
+    def take(self, mask):
+        """
+        :param mask:    np.ndarray of bool, cells to keep
+        :return:        AuthorshipCube of the cells in mask
+        """
+        rows = np.full(len(mask), -1, dtype=np.int64)
+        rows[mask] = np.arange(np.count_nonzero(mask))
+        cells = rows[self.keys >> self.precision]
+        kept = cells >= 0
+        keys = (cells[kept] << self.precision) + (self.keys[kept] & ((1 << self.precision) - 1))
+        return AuthorshipCube(self.counts[mask], keys, self.ranks[kept], precision=self.precision)
+
+    def select(self, fields=None, venues=None, exclude_venues=None, years=None):
+        """
+        :param fields:          None or list of str, fields to keep, default: all
+        :param venues:          None or list of str, venues to keep, default: all
+        :param exclude_venues:  None or list of str, venues to drop
+        :param years:           None or tuple of the first and last year to keep, either may be None
+        :return:                AuthorshipCube of the selected cells
+        """
+        mask = np.ones(len(self.counts), dtype=bool)
+        if fields is not None:
+            mask &= self.counts.index.get_level_values('field').isin(fields)
+        if venues is not None:
+            mask &= self.counts.index.get_level_values('venue').isin(venues)
+        if exclude_venues is not None:
+            mask &= ~self.counts.index.get_level_values('venue').isin(exclude_venues)
+        if years is not None:
+            mask &= _in_years(self.counts.index.get_level_values('year'), years)
+        return self.take(mask)
+
+    def aggregate(self, group_attrs=None, positions=None):
+        """
+        Compute the same aggregates as 'aggregate_authorship' from the counters.
+
+        :param group_attrs: list of str, levels to use for grouping, default: ['venue', 'year']
+        :param positions:   list of str, any of 'first', 'last', 'any' and 'all', default: all of them
+        :return:            dict of aggregates per position
+        """
+        return aggregate_authorship_counts(self.counts.reset_index(), group_attrs=group_attrs, positions=positions)
+
+    def authors(self, group_attrs=None):
+        """
+        :param group_attrs: list of str, levels to use for grouping, default: ['venue']
+        :return:            pd.Series of the estimated number of distinct authors per group
+        """
+        if group_attrs is None:
+            group_attrs = ['venue']
+        groups = self.counts.groupby(level=group_attrs)
+        group_of_cell = groups.ngroup().to_numpy().astype(np.int64)
+        keys = (group_of_cell[self.keys >> self.precision] << self.precision) + \
+            (self.keys & ((1 << self.precision) - 1))
+        keys, ranks = self._max_per_key(keys, self.ranks)
+        estimates = HyperLogLog.estimate_sparse(keys >> self.precision, ranks, groups.ngroups, self.precision)
+        return pd.Series(estimates, index=groups.size().index, name='authors')
+
+    def statistics(self):
+        """
+        :return:    pd.DataFrame of the statistics per venue as saved to '/output/statistics.txt', the number of unique
+                    authors is estimated
+        """
+        venues = self.counts.reset_index().groupby('venue')
+        statistics = pd.DataFrame({
+            ('year', 'min'): venues['year'].min(),
+            ('year', 'max'): venues['year'].max(),
+            ('paper_id', 'nunique'): venues['papers'].sum(),
+            ('author_id', 'nunique'): self.authors(['venue']),
+        })
+        statistics.index.name = 'venue'
+        return statistics
+
+    def save(self, path):
+        """
+        :param path:    string, path to a feather file with a row per cell and the non-zero registers and their ranks
+                        as list columns
+        """
+        table = pa.Table.from_pandas(self.counts.reset_index(), preserve_index=False)
+        offsets = pa.array(np.searchsorted(self.keys >> self.precision, np.arange(len(self.counts) + 1)), pa.int32())
+        registers = (self.keys & ((1 << self.precision) - 1)).astype(np.uint16)
+        table = table.append_column('registers', pa.ListArray.from_arrays(offsets, pa.array(registers)))
+        table = table.append_column('ranks', pa.ListArray.from_arrays(offsets, pa.array(self.ranks)))
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               b'precision': str(self.precision).encode()})
+        with pa.ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table)
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path:    string, path to a feather file written by 'save'
+        :return:        AuthorshipCube
+        """
+        with pa.ipc.open_file(path) as reader:
+            table = reader.read_all()
+        precision = int(table.schema.metadata[b'precision'])
+        registers = table.column('registers').combine_chunks()
+        ranks = table.column('ranks').combine_chunks()
+        counts = table.drop(['registers', 'ranks']).to_pandas().set_index(cls.KEYS)
+        cells = np.repeat(np.arange(len(counts), dtype=np.int64), np.diff(registers.offsets.to_numpy()))
+        keys = (cells << precision) + registers.flatten().to_numpy().astype(np.int64)
+        return cls(counts, keys, ranks.flatten().to_numpy().astype(np.uint8), precision=precision)
+
+
+class GenderStore:
+    """
+    Persistent SQLite store of the first names with genders from the files returned by the Gender-API. Opening the store
+    does not read any file, only files that are new or changed since the last update are imported, and the genders are
+    looked up in bulk by first name.
+
+    If a first name is found in more than one file, the entry with a gender wins over one without, then the entry with
+    more samples ('ga_samples'), then the entry of the most recently modified file and last the earlier row of a file.
+    """
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER);
+        CREATE TABLE IF NOT EXISTS entries (first_name TEXT, source TEXT, position INTEGER, gender TEXT,
+                                            accuracy INTEGER, samples INTEGER);
+        CREATE INDEX IF NOT EXISTS entries_source ON entries (source);
+        CREATE TABLE IF NOT EXISTS genders (first_name TEXT PRIMARY KEY, gender TEXT, accuracy INTEGER);
+    """
+    _RESOLVE = """
+        INSERT INTO genders
+        SELECT first_name, gender, accuracy FROM (
+            SELECT entries.first_name, entries.gender, entries.accuracy,
+                   ROW_NUMBER() OVER (PARTITION BY entries.first_name
+                                      ORDER BY entries.samples DESC, files.mtime_ns DESC, entries.position) AS rank
+            FROM entries JOIN files ON entries.source = files.path
+            WHERE entries.gender IS NOT NULL)
+        WHERE rank = 1
+    """
+    # SQLite limits the number of parameters of a statement
+    _LOOKUP_CHUNK_SIZE = 900
+
+    def __init__(self, path):
+        """
+        :param path:    string, path to the SQLite file, it is created if it does not exist
+        """
+        self.path = path
+        self._connection = None
+
+    def __getstate__(self):
+        # Connections can't be shared between processes, each process opens its own one
+        return {'path': self.path, '_connection': None}
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path)
+            self._connection.executescript(self._SCHEMA)
+        return self._connection
+
+    def update(self, gapi_files):
+        """
+        Import the files that are new or changed since the last update and drop the entries of removed files.
+
+        :param gapi_files:  list of paths to csv files as returned by the Gender-API
+        :return:            bool, True if the store changed
+        """
+        current = {}
+        for gapi_file in gapi_files:
+            stat = os.stat(gapi_file)
+            current[os.path.abspath(gapi_file)] = (stat.st_size, stat.st_mtime_ns)
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in
+                 self.connection.execute("SELECT path, size, mtime_ns FROM files")}
+        outdated = [path for path in known if known[path] != current.get(path)]
+        added = [path for path in current if known.get(path) != current[path]]
+        if not outdated and not added:
+            return False
+
+        with self.connection:
+            for path in outdated:
+                self.connection.execute("DELETE FROM entries WHERE source = ?", (path,))
+                self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+            for path in added:
+                self.connection.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                                            self._read_entries(path))
+                self.connection.execute("INSERT INTO files VALUES (?, ?, ?)", (path, *current[path]))
+            self.connection.execute("DELETE FROM genders")
+            self.connection.execute(self._RESOLVE)
+        return True
+
+    @staticmethod
+    def _read_entries(path):
+        # Names such as 'Nan' or 'Na' are first names, only empty fields are missing values
+        gender_enriched_names = pd.read_csv(path, sep=';', keep_default_na=False,
+                                            na_values={'ga_gender': [''], 'ga_accuracy': [''], 'ga_samples': ['']})
+        gender_enriched_names = gender_enriched_names[gender_enriched_names['first_name'] != '']
+        if 'ga_samples' in gender_enriched_names:
+            samples = gender_enriched_names['ga_samples'].fillna(0).astype(int).tolist()
+        else:
+            samples = [0] * len(gender_enriched_names)
+        genders = gender_enriched_names['ga_gender']
+        genders = genders.astype(object).where(genders.notna(), None)
+        accuracies = gender_enriched_names['ga_accuracy']
+        accuracies = accuracies.astype('Int64').astype(object).where(accuracies.notna(), None)
+        return zip(gender_enriched_names['first_name'].astype(str), itertools.repeat(path), itertools.count(),
+                   genders.tolist(), accuracies.tolist(), samples)
+
+    def _select(self, query, first_names):
+        # Run the query with the placeholder 'names' replaced by chunks of the distinct first names
+        first_names = list(set(first_names))
+        for start in range(0, len(first_names), self._LOOKUP_CHUNK_SIZE):
+            chunk = first_names[start:start + self._LOOKUP_CHUNK_SIZE]
+            yield from self.connection.execute(query.format(names=','.join('?' * len(chunk))), chunk)
+
+    def lookup(self, first_names):
+        """
+        Look up the genders of many first names at once.
+
+        :param first_names: iterable of strings
+        :return:            dict of the known first names to tuples of the Gender-API's gender and accuracy
+        """
+        query = "SELECT first_name, gender, accuracy FROM genders WHERE first_name IN ({names})"
+        return {first_name: (gender, accuracy) for first_name, gender, accuracy in self._select(query, first_names)}
+
+    def load(self):
+        """
+        :return:    dict of all known first names to tuples of the Gender-API's gender and accuracy
+        """
+        return {first_name: (gender, accuracy) for first_name, gender, accuracy in
+                self.connection.execute("SELECT first_name, gender, accuracy FROM genders")}
+
+    def missing(self, first_names):
+        """
+        :param first_names: iterable of strings
+        :return:            set of the first names without any entry, including entries without gender
+        """
+        first_names = set(first_names)
+        query = "SELECT DISTINCT first_name FROM entries WHERE first_name IN ({names})"
+        return first_names.difference(first_name for (first_name,) in self._select(query, first_names))
+
+    def digest(self):
+        """
+        :return:    string, hash of the imported files that changes with each update of the store
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for row in self.connection.execute("SELECT path, size, mtime_ns FROM files ORDER BY path"):
+            digest.update(repr(row).encode())
+        return digest.hexdigest()
+
+
+class GenderResolver:
+    """
+    Resolves the gender of full names against a GenderStore of the first names with genders from Gender-API. Use
+    GenderResolver.from_path to update the store only once per source path.
+    """
+    _resolvers = {}
+
+    def __init__(self, store):
+        """
+        :param store:   GenderStore, containing the first names with genders as returned by the Gender-API
+        """
+        self.store = store
+        # Number of distinct names resolved by their first or a middle name or not at all and of looked up names found
+        # in the store or not
+        self.counts = collections.Counter()
+
+    @classmethod
+    def from_path(cls, gapi_path):
+        """
+        Return the resolver for the file(s) given under gapi_path, the files are imported into a store under .cache
+        if they are new or changed.
+
+        :param gapi_path:   path, both a file or a directory is accepted
+        :return:            GenderResolver
+        """
+        key = os.path.abspath(gapi_path)
+        if key not in cls._resolvers:
+            digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+            store = GenderStore(os.path.join(_CACHE_DIR, 'genders', f"{digest}.sqlite"))
+            if store.update(_gapi_files(gapi_path)):
+                click.echo("Update the store of gender-enriched names")
+            cls._resolvers[key] = cls(store)
+            click.echo("Load the gender-enriched name list")
+        return cls._resolvers[key]
+
+    @staticmethod
+    def _label(gender, accuracy):
+        if accuracy == 50 or gender == 'unknown':
             # GenderAPI's 'unknown' names always have an accuracy of 50
-            return ('neutral', accuracy) if with_accuracy else 'neutral'
+            return 'neutral', accuracy
         elif gender == 'male':
-            return ('man', accuracy) if with_accuracy else 'man'
+            return 'man', accuracy
         elif gender == 'female':
-            return ('woman', accuracy) if with_accuracy else 'woman'
+            return 'woman', accuracy
+        return None, None
+
+    def _lookup(self, first_names):
+        first_names = set(first_names)
+        genders = self.store.lookup(first_names)
+        self.counts['store_hits'] += len(genders)
+        self.counts['store_misses'] += len(first_names) - len(genders)
+        return genders
+
+    def resolve_name(self, author_name):
+        """
+        Checks the gender of the first name and falls back to the middle names if the first name is not known.
+
+        :param author_name: string, full name divided with a space, first name comes first
+        :return:            tuple of gender ('woman', 'man', 'neutral' or None) and accuracy
+        """
+        _, _, _, first_name_candidate, candidates = _parse_author_name(author_name)
+        genders = self._lookup(candidates)
+        for name in candidates:
+            if name in genders:
+                self.counts['first_name_hits' if name == first_name_candidate else 'middle_name_fallbacks'] += 1
+                return self._label(*genders[name])
+        self.counts['unresolved'] += 1
+        return None, None
+
+    def resolve(self, names):
+        """
+        Resolve the gender of many names at once, each distinct name is parsed and checked once and all first and
+        middle names are looked up in the store together.
+
+        :param names:   iterable of strings, full names divided with a space, first name comes first
+        :return:        pd.DataFrame indexed by the distinct names with the columns 'gender' and 'accuracy'
+        """
+        names = parse_author_names(names)
+        candidates = names['candidates'].explode().dropna()
+        genders = self._lookup(candidates)
+        labels = {name: self._label(*entry) for name, entry in genders.items()}
+
+        # The first known candidate of a name decides, it's a fallback if it's not the first name
+        known = candidates[candidates.isin(labels.keys())]
+        first_known = known[~known.index.duplicated()]
+        fallbacks = int((first_known != names['first_name_candidate'].reindex(first_known.index)).sum())
+        self.counts['first_name_hits'] += len(first_known) - fallbacks
+        self.counts['middle_name_fallbacks'] += fallbacks
+        self.counts['unresolved'] += len(names) - len(first_known)
+
+        resolved = pd.DataFrame(first_known.map(labels).tolist(), columns=['gender', 'accuracy'],
+                                index=first_known.index, dtype=object)
+        return resolved.reindex(names.index).astype(object).where(lambda df: df.notna(), None)
+
+
+def resolve_names_with_gapi(source, gapi_path, url=None, key=None, batch_size=100, concurrency=4, rate=None):
+    """
+    Look up the genders of the first names in source that are not yet in the store of gapi_path with the Gender-API
+    and save the results as a new csv file under gapi_path, as if they were uploaded and downloaded by hand.
+
+    :param source:      path to csv file with the column 'first_name', e.g. 'helper_files/unprocessed_first_names.csv'
+    :param gapi_path:   path to the directory of the files returned by the Gender-API
+    :param url:         None or string, endpoint compatible with Gender-API's multi name query, default: Gender-API
+    :param key:         None or string, API key sent with each request
+    :param batch_size:  int, number of names per request, Gender-API accepts up to 100
+    :param concurrency: int, number of requests (and connections) in flight at the same time
+    :param rate:        None or float, maximum number of requests per second
+    :return:            tuple of the path to the written file (None if all names were known) and the number of names
+    """
+    first_names = pd.read_csv(source, keep_default_na=False)['first_name']
+    resolver = GenderResolver.from_path(gapi_path)
+    misses = sorted(resolver.store.missing(name for name in first_names if name != ''))
+    click.echo(f"{len(misses)} of {first_names.nunique()} first names are not in the store")
+    if not misses:
+        return None, 0
+
+    batches = [misses[start:start + batch_size] for start in range(0, len(misses), batch_size)]
+    results = []
+    destination = None
+    try:
+        asyncio.run(_query_gapi(batches, results, url or _GAPI_URL, key, concurrency, rate))
+    finally:
+        # Keep the names of finished requests even if a later request failed
+        if results:
+            destination = _write_gapi_results(results, gapi_path)
+            resolver.store.update(_gapi_files(gapi_path))
+            click.echo(f"Saved the genders of {len(results)} first names to {destination}")
+    return destination, len(results)
+
+
+async def _query_gapi(batches, results, url, key, concurrency, rate):
+    # The blocking requests run in threads, each one takes a kept-alive connection from the pool
+    url = urllib.parse.urlsplit(url)
+    connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+    connections = asyncio.Queue()
+    for _ in range(concurrency):
+        connections.put_nowait(connection_class(url.netloc, timeout=60))
+    limiter = _RateLimiter(rate)
+    loop = asyncio.get_running_loop()
+
+    async def query(batch):
+        await limiter.wait()
+        connection = await connections.get()
+        try:
+            rows = await loop.run_in_executor(executor, _request_gapi_batch, connection, url, key, batch)
+        finally:
+            connections.put_nowait(connection)
+        results.extend(rows)
+
+    tasks = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            tasks = [asyncio.ensure_future(query(batch)) for batch in batches]
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            while not connections.empty():
+                connections.get_nowait().close()
+
+
+class _RateLimiter:
+    # Spaces the start of the requests evenly to at most rate requests per second
+    def __init__(self, rate):
+        self._interval = 1 / rate if rate else 0
+        self._next = 0
+
+    async def wait(self):
+        now = time.monotonic()
+        start = max(self._next, now)
+        self._next = start + self._interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+def _request_gapi_batch(connection, url, key, batch, retries=5):
+    """
+    Send one multi name query and return its rows in the format of the files returned by the Gender-API. Rate limited
+    (429) and failed (5xx) requests are retried with exponential backoff.
+
+    :return:    list of tuples of first_name, ga_first_name, ga_gender, ga_accuracy and ga_samples
+    """
+    query = {'name': ';'.join(batch), 'multi': 'true'}
+    if key:
+        query['key'] = key
+    target = f"{url.path or '/'}?{urllib.parse.urlencode(query)}"
+    for attempt in range(retries + 1):
+        try:
+            connection.request('GET', target)
+            response = connection.getresponse()
+            body = response.read()
+        except (http.client.HTTPException, OSError):
+            # The server may have closed the kept-alive connection, it is opened again with the next request
+            connection.close()
+            if attempt == retries:
+                raise
         else:
-            return (None, None) if with_accuracy else None
+            if response.status == 200:
+                break
+            if response.status != 429 and response.status < 500 or attempt == retries:
+                raise RuntimeError(f"Gender-API request failed with status {response.status}: {body[:200]!r}")
+        time.sleep(min(2 ** attempt, 30))
+
+    answer = json.loads(body)
+    if 'errno' in answer:
+        raise RuntimeError(f"Gender-API request failed with error {answer['errno']}: {answer.get('errmsg')}")
+    # Results keep the order of the requested names
+    return [(first_name, result.get('name_sanitized', first_name), result.get('gender'), result.get('accuracy'),
+             result.get('samples')) for (first_name, result) in zip(batch, answer['result'])]
+
+
+def _write_gapi_results(results, gapi_path):
+    os.makedirs(gapi_path, exist_ok=True)
+    destination = os.path.join(gapi_path, f"gapi_{time.strftime('%Y%m%d%H%M%S')}.csv")
+    for index in itertools.count(1):
+        if not os.path.exists(destination):
+            break
+        destination = os.path.join(gapi_path, f"gapi_{time.strftime('%Y%m%d%H%M%S')}_{index}.csv")
+    df = pd.DataFrame(results, columns=['first_name', 'ga_first_name', 'ga_gender', 'ga_accuracy', 'ga_samples'])
+    df['ga_accuracy'] = df['ga_accuracy'].astype('Int64')
+    df['ga_samples'] = df['ga_samples'].astype('Int64')
+    df.sort_values(['first_name'], inplace=True)
+    # Write to a temporary file first, the store must never import a partially written file
+    df.to_csv(f"{destination}.tmp", sep=';', index=False)
+    os.replace(f"{destination}.tmp", destination)
+    return destination
 
 
 def aggregate_authorship(df, group_attrs=None, funcs=None):
@@ -295,7 +1951,8 @@ def aggregate_authorship(df, group_attrs=None, funcs=None):
     :param df:          pd.DataFrame, containing authorships. See method 'authorships' for more details.
     :param group_attrs: list of str, columns to use for grouping, default: ['venue', 'year']. Also: ['field', 'year'].
     :param funcs:       dict of functions with names to be accessed by later, possible options: _first_woman_author,
-                        _last_woman_author, _any_woman_author, _all_woman_author
+                        _last_woman_author, _any_woman_author, _all_woman_author. These are computed together in one
+                        pass, any other function is applied to the authorships of each paper.
     :return:            dict of aggregates per functions specified in param func
     """
     if group_attrs is None:
@@ -308,100 +1965,589 @@ def aggregate_authorship(df, group_attrs=None, funcs=None):
             'any': _any_woman_author,
             'all': _all_woman_author
         }
+    keys = ['paper_id'] + group_attrs
+
+    # Compute all built-in positions per paper in one pass, custom functions are applied per paper
+    positions = {name: _POSITION_REDUCTIONS[fn] for (name, fn) in funcs.items() if fn in _POSITION_REDUCTIONS}
+    if positions:
+        df_positions = _woman_by_paper(df, keys, set(positions.values()))
+
     for (name, fn) in funcs.items():
         # First group by paper ID to calculate values per paper
-
-        df_agg = df.groupby(['paper_id'] + group_attrs).apply(fn).to_frame('woman')
+        if name in positions:
+            df_agg = df_positions[[positions[name]]].rename(columns={positions[name]: 'woman'})
+        else:
+            df_agg = df.groupby(keys, observed=True).apply(fn).to_frame('woman')
 
         # Then group by conference and year and calculate the percentage
-        aggregates[name] = df_agg.groupby(group_attrs).mean().multiply(100)
+        aggregates[name] = df_agg.groupby(group_attrs, observed=True).mean().multiply(100)
 
     return aggregates
 
 
+def _woman_by_paper(df, keys, positions):
+    """
+    Check per paper whether a woman is at the given positions of the authors list with a single grouping. The first and
+    last author are the rows at the respective position within the paper's group as in '_first_woman_author' and
+    '_last_woman_author'.
+
+    :param df:          pd.DataFrame, containing authorships. See method 'authorships' for more details.
+    :param keys:        list of str, columns identifying a paper
+    :param positions:   set of str, any of 'first', 'last', 'any' and 'all'
+    :return:            pd.DataFrame indexed by keys with a column per position
+    """
+    woman = df['woman'].astype(int)
+    columns = {}
+    reductions = {}
+    if 'first' in positions or 'last' in positions:
+        within = df.groupby(keys, observed=True).cumcount()
+        if 'first' in positions:
+            columns['first'] = woman.where(within == 0)
+            reductions['first'] = ('first', 'max')
+        if 'last' in positions:
+            columns['last'] = woman.where(within == df['author_position_last'] - 1)
+            reductions['last'] = ('last', 'max')
+    if 'any' in positions:
+        columns['any'] = woman
+        reductions['any'] = ('any', 'max')
+    if 'all' in positions:
+        columns['all'] = woman
+        reductions['all'] = ('all', 'min')
+
+    return pd.DataFrame(columns).join(df[keys]).groupby(keys, observed=True).agg(**reductions)
+
+
+def aggregate_authorship_counts(counts, group_attrs=None, positions=None):
+    """
+    Compute the same aggregates as 'aggregate_authorship' from counted papers, e.g. the counts of an AuthorshipCube.
+    Use '_exclude_venue' and '_get_field' on the counts to select venues.
+
+    :param counts:      pd.DataFrame, with the columns 'papers' and the number of papers per position
+    :param group_attrs: list of str, columns to use for grouping, default: ['venue', 'year']. Also: ['field', 'year'].
+    :param positions:   list of str, any of 'first', 'last', 'any' and 'all', default: all of them
+    :return:            dict of aggregates per position
+    """
+    if group_attrs is None:
+        group_attrs = ['venue', 'year']
+    if positions is None:
+        positions = ['first', 'last', 'any', 'all']
+    counts = counts.groupby(group_attrs, observed=True)[['papers'] + positions].sum()
+    return {position: counts[[position]].div(counts['papers'], axis=0).multiply(100)
+            .rename(columns={position: 'woman'}) for position in positions}
+
+
+def replicate_aggregate_authorship(df, replicates=100, seed=None, workers=1, group_attrs=None, positions=None,
+                                   percentiles=(2.5, 97.5), woman_ratio=None):
+    """
+    Repeat the random assumption of '_assume_gender_weighted' followed by 'aggregate_authorship' for many replicates at
+    once. Authorships with known gender stay fixed, all unknown and neutral authors are assigned for all replicates in
+    one draw and the percentage of papers with a woman at the given positions is computed for all replicates together.
+    Replicates are computed in chunks of fixed size which are spread across a process pool, so results only depend on
+    the seed and not on the number of workers.
+
+    :param df:          pd.DataFrame, containing authorships without assumed genders. See method 'authorships'.
+    :param replicates:  int, number of random assignments
+    :param seed:        None or int, seed for the random assignments
+    :param workers:     int, number of processes to use
+    :param group_attrs: list of str, columns to use for grouping, default: ['venue', 'year']. Also: ['field', 'year'].
+    :param positions:   list of str, any of 'first', 'last', 'any' and 'all', default: all of them
+    :param percentiles: tuple of two floats, lower and upper percentile of the replicates to return
+    :param woman_ratio: float or None, ratio of woman among the known authors. It is computed from df if not given, pass
+                        it to assume genders based on a larger table than df.
+    :return:            dict of aggregates per position with the columns 'woman' (mean of all replicates), 'lower' and
+                        'upper' (the percentiles)
+    """
+    if group_attrs is None:
+        group_attrs = ['venue', 'year']
+    if positions is None:
+        positions = ['first', 'last', 'any', 'all']
+    if woman_ratio is None:
+        woman_ratio = _woman_ratio(df)
+
+    layout = _replicate_layout(df, group_attrs)
+    chunks = [len(chunk) for chunk in np.array_split(np.arange(replicates), -(-replicates // _REPLICATE_CHUNK_SIZE))]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [(size, chunk_seed, woman_ratio, positions) for size, chunk_seed in zip(chunks, seeds)]
+
+    if workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_replicate_worker,
+                                                    initargs=(layout,)) as executor:
+            results = list(executor.map(_replicate_chunk, tasks))
+    else:
+        _init_replicate_worker(layout)
+        results = [_replicate_chunk(task) for task in tasks]
+
+    aggregates = {}
+    for position in positions:
+        values = np.concatenate([result[position] for result in results], axis=1)
+        lower, upper = np.percentile(values, percentiles, axis=1)
+        aggregates[position] = pd.DataFrame({'woman': values.mean(axis=1), 'lower': lower, 'upper': upper},
+                                            index=layout['groups'])
+    return aggregates
+
+
+def _replicate_layout(df, group_attrs):
+    """
+    Describe the authorships as plain arrays for '_replicate_chunk': the gender of every row, the unknown and neutral
+    authors, the rows of each paper and the group of each paper.
+    """
+    uncertain = ((df['unknown'] == 1) | (df['neutral'] == 1)).to_numpy()
+    author_codes = np.full(len(df), -1)
+    author_codes[uncertain], author_ids = pd.factorize(df.loc[uncertain, 'author_id'])
+
+    # Rows sorted by paper, positions within a paper follow the order of the rows as in '_first_woman_author'
+    paper_codes = df.groupby(['paper_id'] + group_attrs, sort=False, observed=True).ngroup().to_numpy()
+    order = np.argsort(paper_codes, kind='stable')
+    starts = np.flatnonzero(np.r_[True, paper_codes[order][1:] != paper_codes[order][:-1]])
+    first = order[starts]
+    last = order[starts + df['author_position_last'].to_numpy()[first] - 1]
+
+    # Papers sorted by group
+    papers = df.iloc[first][group_attrs]
+    paper_groups = papers.groupby(group_attrs, observed=True).ngroup().to_numpy()
+    paper_order = np.argsort(paper_groups, kind='stable')
+    group_starts = np.flatnonzero(np.r_[True, paper_groups[paper_order][1:] != paper_groups[paper_order][:-1]])
+    group_sizes = papers.groupby(group_attrs, observed=True).size()
+
+    return {
+        'woman': (df['woman'] == 1).to_numpy(),
+        'uncertain': uncertain,
+        'author_codes': author_codes,
+        'authors': len(author_ids),
+        'order': order,
+        'starts': starts,
+        'first': first,
+        'last': last,
+        'paper_order': paper_order,
+        'group_starts': group_starts,
+        'group_sizes': group_sizes.to_numpy(),
+        'groups': group_sizes.index,
+    }
+
+
+def _init_replicate_worker(layout):
+    global _replicate_worker_layout
+    _replicate_worker_layout = layout
+
+
+def _replicate_chunk(task):
+    # Compute the percentage of papers with a woman at each position per group for a chunk of replicates
+    size, chunk_seed, woman_ratio, positions = task
+    layout = _replicate_worker_layout
+
+    # One column per replicate
+    author_is_woman = np.random.default_rng(chunk_seed).random((layout['authors'], size)) <= woman_ratio
+    woman = np.where(layout['uncertain'][:, None], author_is_woman[layout['author_codes']],
+                     layout['woman'][:, None])
+
+    result = {}
+    for position in positions:
+        if position == 'first':
+            papers = woman[layout['first']]
+        elif position == 'last':
+            papers = woman[layout['last']]
+        elif position == 'any':
+            papers = np.logical_or.reduceat(woman[layout['order']], layout['starts'], axis=0)
+        else:
+            papers = np.logical_and.reduceat(woman[layout['order']], layout['starts'], axis=0)
+        papers = papers[layout['paper_order']].astype(np.int64)
+        result[position] = np.add.reduceat(papers, layout['group_starts'], axis=0) \
+            / layout['group_sizes'][:, None] * 100
+    return result
+
+
 def plot_moving_averages_of_authorships(df, plot_label, save=None, header=True):
     """
     Plots or saves 3-year moving averages of the percentage of woman being at a certain position of the authors list.
 
-    :param df:          pd.DataFrame of aggregates, See 'aggregate_authorship' for more details.
+    :param df:          pd.DataFrame of aggregates, See 'aggregate_authorship' for more details. If it contains the
+                        columns 'lower' and 'upper' as returned by 'replicate_aggregate_authorship', the interval
+                        between them is drawn as a shaded band around each line.
     :param plot_label:  string, to be added to the plot's title or file's name if param save == None.
                         Referring to the position of a female author.
     :param save:        None or str, whether to save the plot as pgf under given name or to show it.
     :param header:      bool, whether to add a title to the to be displayed plot.
     """
     # Calculate the rolling mean across three years
-    rolling_mean = df.unstack(level=0).sort_values(['year']).ffill() \
-                     .rolling(window=3).mean()
+    frames = _rolling_frames(df)
 
     # Generate a simple line plot
     if header:
         plot_title = 'Authors who are women by year (%s)' % plot_label
     else:
         plot_title = None
-    fig = rolling_mean.plot(figsize=(15, 8), title=plot_title)
+
+    # Optionally save to file
+    if save:
+        # Calculate the filename
+        if isinstance(save, str):
+            filename = save
+        else:
+            filename = plot_label.replace(' ', '_')
+        filename += '.pgf'
+        _render_figure((frames, plot_title, os.path.join('output', filename)))
+    else:
+        figure = plt.figure(figsize=(15, 8))
+        _draw_moving_averages(figure.subplots(), *frames, title=plot_title)
+        plt.show()
+
+
+def render_figures(source=_AGGREGATES_PATH, destination='output', formats=('pgf',), figures=None, workers=1,
+                   header=False, force=False):
+    """
+    Render the figures of 3-year moving averages of the percentage of woman being at a certain position of the authors
+    list from stored aggregates, without showing them. The rolling means of a figure are calculated once for all
+    formats. A figure is skipped if its data, style and drawing code did not change since it was rendered to
+    destination and the file was not changed since.
+
+    :param source:      path of the aggregates stored by the 'plots' stage of the analysis
+    :param destination: path of the directory to save the figures to
+    :param formats:     list of str, file formats supported by matplotlib, e.g. 'pgf', 'png' or 'pdf'
+    :param figures:     None or list of str, names of the figures in _FIGURES to render, default: all
+    :param workers:     int, number of processes to render the figures with
+    :param header:      bool, whether to add a title to the figures
+    :param force:       bool, whether to render unchanged figures, too
+    :return:            list of paths of the rendered figures
+    """
+    figures = list(_FIGURES) if figures is None else figures
+    for name in figures:
+        if name not in _FIGURES:
+            raise ValueError(f"Unknown figure {name}, figures are: {', '.join(_FIGURES)}")
+    aggregates = pd.read_pickle(source)
+    code = ''.join(inspect.getsource(fn) for fn in (_render_figure, _draw_moving_averages))
+
+    tasks = []
+    markers = []
+    for name in figures:
+        view, position, plot_label = _FIGURES[name]
+        frames = _rolling_frames(aggregates[view][position])
+        title = 'Authors who are women by year (%s)' % plot_label if header else None
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{_CACHE_VERSION};{title!r};{_FIGURE_STYLE!r};{_PGF_STYLE!r};{code}".encode())
+        for frame in frames:
+            if frame is not None:
+                digest.update(repr(frame.columns.tolist()).encode())
+                digest.update(pd.util.hash_pandas_object(frame).to_numpy().tobytes())
+
+        for file_format in formats:
+            path = os.path.join(destination, f"{name}.{file_format}")
+            key = digest.copy()
+            key.update(file_format.encode())
+            marker = os.path.join(_FIGURE_CACHE_DIR, hashlib.blake2b(os.path.abspath(path).encode(),
+                                                                     digest_size=16).hexdigest() + '.json')
+            recorded = None
+            if not force and os.path.exists(marker):
+                with open(marker) as f:
+                    recorded = json.load(f)
+            if recorded == {'key': key.hexdigest(), 'output': _output_stat(path)}:
+                click.echo(f"Skip unchanged figure {path}")
+                continue
+            click.echo(f"Render figure {path}")
+            tasks.append((frames, title, path))
+            markers.append((marker, key.hexdigest()))
+
+    os.makedirs(destination, exist_ok=True)
+    if workers > 1 and len(tasks) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            rendered = list(executor.map(_render_figure, tasks))
+    else:
+        rendered = [_render_figure(task) for task in tasks]
+
+    os.makedirs(_FIGURE_CACHE_DIR, exist_ok=True)
+    for path, (marker, key) in zip(rendered, markers):
+        with open(marker, 'w') as f:
+            json.dump({'key': key, 'output': _output_stat(path)}, f)
+    return rendered
+
+
+def show_figures(source=_AGGREGATES_PATH, figures=None):
+    """
+    Show the figures of 3-year moving averages with titles one after another.
+
+    :param source:  path of the aggregates stored by the 'plots' stage of the analysis
+    :param figures: None or list of str, names of the figures in _FIGURES to show, default: all
+    """
+    aggregates = pd.read_pickle(source)
+    for name in list(_FIGURES) if figures is None else figures:
+        view, position, plot_label = _FIGURES[name]
+        plot_moving_averages_of_authorships(aggregates[view][position], plot_label, save=False)
+
+
+def _render_figure(task):
+    # Draws and saves a figure without pyplot, so the backend of the process stays as it is
+    frames, title, path = task
+    style = {**_FIGURE_STYLE, **_PGF_STYLE} if path.endswith('.pgf') else _FIGURE_STYLE
+    with matplotlib.rc_context(style):
+        figure = matplotlib.figure.Figure(figsize=(15, 8))
+        _draw_moving_averages(figure.subplots(), *frames, title=title)
+        figure.set_tight_layout(True)
+        figure.savefig(path)
+    return path
+
+
+def _draw_moving_averages(ax, rolling_mean, lower=None, upper=None, title=None):
+    # Generate a simple line plot
+    rolling_mean.plot(ax=ax, title=title)
 
     # Set the markers
     markers = itertools.cycle((',', '+', '.', 'o', '*', 'x', '^', 'P'))
-    for line in fig.get_lines():
+    for line in ax.get_lines():
         line.set_marker(next(markers))
 
+    # Shade the interval of the replicates
+    if lower is not None and upper is not None:
+        for line, (_, group) in zip(ax.get_lines(), rolling_mean.columns):
+            ax.fill_between(rolling_mean.index, lower[('lower', group)], upper[('upper', group)],
+                            color=line.get_color(), alpha=0.2, linewidth=0)
+
     # Add x-axis labels every other year
-    fig.xaxis.set_major_locator(ticker.MultipleLocator(5))
+    ax.xaxis.set_major_locator(ticker.MultipleLocator(5))
 
     # y-axis is always a percentage of all papers
-    fig.set_ylabel('% of papers')
+    ax.set_ylabel('% of papers')
 
     # Strip the extra group part from legends
-    fig.legend([c.split(', ')[1].rstrip(')')
-                for c in fig.get_legend_handles_labels()[1]])
+    ax.legend([c.split(', ')[1].rstrip(')')
+               for c in ax.get_legend_handles_labels()[1]])
 
-    # Optionally save to file
-    if save:
-        # Set matplotlib parameters
-        matplotlib.use('pgf')
-        matplotlib.rcParams.update({
-            'pgf.texsystem': 'pdflatex',
-            'font.family': 'serif',
-            'text.usetex': True,
-            'pgf.rcfonts': False,
-            'font.size': 20,
-        })
 
-        # Calculate the filename
-        if isinstance(save, str):
-            filename = save
-        else:
-            filename = plot_label.replace(' ', '_')
-        filename += '.pgf'
+def _rolling_frames(df):
+    # Rolling means of the percentage of woman and of the interval of the replicates, if any
+    rolling_mean = _rolling_mean(df[['woman']])
+    if 'lower' in df.columns and 'upper' in df.columns:
+        return rolling_mean, _rolling_mean(df[['lower']]), _rolling_mean(df[['upper']])
+    return rolling_mean, None, None
 
-        fig.figure.set_tight_layout(True)
-        fig.figure.savefig(os.path.join('output', filename))
-    else:
-        matplotlib.use('TkAgg')
-        plt.show()
+
+def _rolling_mean(df, window=3):
+    # Calculate the rolling mean of the aggregates per group across years
+    return df.unstack(level=0).sort_values(['year']).ffill().rolling(window=window).mean()
+
+
+class AnalysisServer(http.server.ThreadingHTTPServer):
+    """
+    Keeps the gender-enriched authorships, the cube of their counts with assumed genders and the gender-enriched
+    names in memory and answers queries over HTTP with JSON, so queries don't load and annotate the authorships again.
+    Answers of aggregate queries are kept in a LRU cache.
+
+    - GET /aggregate, the same aggregates as 'aggregate_authorship'. All parameters are optional, lists are comma
+      separated: 'group_attrs' (any of field, venue and year, default: venue,year), 'fields', 'venues',
+      'exclude_venues', 'positions' (any of first, last, any and all, default: all of them), 'years' (e.g. 2000-2019,
+      2000- or -2019) and 'window', the number of years of a rolling mean as in the plots (the groups must end with
+      year then). Returns the rows of each position, e.g. {"first": [{"venue": "SIGMOD", "year": 2019, "woman": 25.1},
+      ...], ...}
+    - GET /gender?name=<full name>, the gender and accuracy of an author's name, see 'GenderResolver.resolve_name'
+    - GET /status, the number of authorships and cells and the hits and misses of the cache
+
+    :param address:     tuple of host and port, port 0 picks a free port
+    :param gapi_path:   path, both a file or a directory is accepted
+    :param seed:        None or int, seed for assuming the gender of unknown and neutral names
+    :param cache_size:  int, number of answers of aggregate queries to keep
+    """
+    daemon_threads = True
+
+    def __init__(self, address, gapi_path, seed=None, cache_size=256):
+        self.authorships = authorships(with_accuracy=True, identity_list=_load_identity_list(), gapi_path=gapi_path)
+        self.cube = AuthorshipCube.from_authorships(_assume_gender_weighted(self.authorships.copy(), seed=seed))
+        # The store's connection is bound to this thread, the handlers look the names up in memory instead
+        self.genders = GenderResolver.from_path(gapi_path).store.load()
+        self.aggregate = functools.lru_cache(maxsize=cache_size)(self._aggregate)
+        super().__init__(address, AnalysisRequestHandler)
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def _aggregate(self, group_attrs, fields, venues, exclude_venues, positions, years, window):
+        # The rolling means need all years, so the years are only selected afterwards then
+        cube = self.cube.select(fields=fields, venues=venues, exclude_venues=exclude_venues,
+                                years=None if window else years)
+        answer = {}
+        for position, aggregate in cube.aggregate(group_attrs=list(group_attrs), positions=list(positions)).items():
+            if aggregate.empty:
+                answer[position] = []
+                continue
+            if window:
+                aggregate = _rolling_by_year(aggregate, window)
+                aggregate = aggregate[_in_years(aggregate.index.get_level_values('year'), years)]
+            answer[position] = aggregate.reset_index().to_dict('records')
+        return json.dumps(answer).encode()
+
+    def gender(self, name):
+        # Checks the first name and falls back to the middle names like 'GenderResolver.resolve_name'
+        gender, accuracy = None, None
+        for candidate in _parse_author_name(name)[4]:
+            if candidate in self.genders:
+                gender, accuracy = GenderResolver._label(*self.genders[candidate])
+                break
+        return json.dumps({'name': name, 'gender': gender, 'accuracy': accuracy}).encode()
+
+    def status(self):
+        return json.dumps({'authorships': len(self.authorships), 'cells': len(self.cube.counts),
+                           'names': len(self.genders), 'cache': self.aggregate.cache_info()._asdict()}).encode()
+
+
+class AnalysisRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answers the queries of an AnalysisServer, invalid queries are answered with status 400 and an 'error'.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            if url.path == '/aggregate':
+                self._send(200, self.server.aggregate(**_parse_aggregate_query(query)))
+            elif url.path == '/gender' and 'name' in query:
+                self._send(200, self.server.gender(query['name'][0]))
+            elif url.path == '/status':
+                self._send(200, self.server.status())
+            else:
+                self._send(404, json.dumps({'error': f"Unknown query {url.path}"}).encode())
+        except ValueError as error:
+            self._send(400, json.dumps({'error': str(error)}).encode())
+        except Exception as error:
+            # Answer anyway, so the client doesn't only see a dropped connection
+            self._send(500, json.dumps({'error': f"{type(error).__name__}: {error}"}).encode())
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
 
 
-def extract_unknown_neutrals(source, destination):
+def _parse_aggregate_query(query):
+    """
+    Check the parameters of an aggregate query and bring them into a hashable and normalized form for the cache.
+
+    :param query:   dict of lists of str, as returned by urllib.parse.parse_qs
+    :return:        dict of the keyword arguments of 'AnalysisServer.aggregate'
+    """
+    unknown = set(query) - {'group_attrs', 'fields', 'venues', 'exclude_venues', 'positions', 'years', 'window'}
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+
+    def values(name):
+        if name not in query:
+            return None
+        return tuple(value for part in query[name] for value in part.split(',') if value)
+
+    group_attrs = values('group_attrs') or ('venue', 'year')
+    if not set(group_attrs) <= set(AuthorshipCube.KEYS) or len(set(group_attrs)) < len(group_attrs):
+        raise ValueError(f"Groups must be distinct attributes of {', '.join(AuthorshipCube.KEYS)}")
+    positions = values('positions') or ('first', 'last', 'any', 'all')
+    if not set(positions) <= {'first', 'last', 'any', 'all'}:
+        raise ValueError('Positions must be any of first, last, any and all')
+
+    years = None
+    if 'years' in query:
+        first, _, last = query['years'][0].partition('-')
+        try:
+            years = (int(first) if first else None, int(last) if last else (None if _ else int(first)))
+        except ValueError:
+            raise ValueError('Years must be given as <first>-<last>, <first>-, -<last> or a single year')
+
+    window = None
+    if 'window' in query:
+        if not query['window'][0].isdigit() or int(query['window'][0]) < 1:
+            raise ValueError('The window must be a positive number of years')
+        window = int(query['window'][0])
+        if group_attrs[-1] != 'year' or len(group_attrs) > 2:
+            raise ValueError('A rolling window needs groups ending with year and at most one other attribute')
+
+    return {
+        'group_attrs': group_attrs,
+        'fields': tuple(sorted(values('fields'))) if 'fields' in query else None,
+        'venues': tuple(sorted(values('venues'))) if 'venues' in query else None,
+        'exclude_venues': tuple(sorted(values('exclude_venues'))) if 'exclude_venues' in query else None,
+        'positions': positions,
+        'years': years,
+        'window': window,
+    }
+
+
+def _rolling_by_year(aggregate, window):
+    # Rolling mean across the years per group as in the plots, years without papers take the last value of the group
+    if aggregate.index.nlevels == 1:
+        return aggregate.sort_index().ffill().rolling(window=window).mean().dropna()
+    group_attr = aggregate.index.names[0]
+    rolling_mean = _rolling_mean(aggregate, window)['woman']
+    rolling_mean.columns.name = group_attr
+    rolling_mean = rolling_mean.reset_index().melt(id_vars='year', value_name='woman').dropna()
+    return rolling_mean.set_index([group_attr, 'year']).sort_index()
+
+
+def _in_years(years, selected):
+    # Mask of the years between the first and last selected year, both may be None
+    first, last = selected or (None, None)
+    mask = np.ones(len(years), dtype=bool)
+    if first is not None:
+        mask &= years >= first
+    if last is not None:
+        mask &= years <= last
+    return mask
+
+
+def extract_unknown_neutrals(source, destination, append=False):
     """
     Read the source csv file, extract names with unknown or neutral names, merge all unique names and paper_ids with
     the same author_id into columns 'author_names' and 'papers' and write pd.DataFrame to destination.
-    Result can be used to manually annotate the gender from known persons.
-    :param source:      path of a csv file
+    Result can be used to manually annotate the gender from known persons. 'neutral' and 'unknown' are 1 if any
+    authorship of the author is neutral or unknown.
+    :param source:      path of a csv file or pd.DataFrame of authorships, e.g. as returned by 'authorships'
     :param destination: path of a csv file
+    :param append:      bool, whether to only add authors that are not in destination yet to it, so annotations in
+                        destination are kept
+    :return:            int, number of written authors
     """
-    df = pd.read_csv(source, usecols=['paper_id', 'author_id', 'author_name', 'man', 'woman', 'neutral', 'unknown'])
-    df = df[(df['neutral'] == 1) | (df['unknown'] == 1)].reset_index(drop=True)
-    grouped = df.groupby('author_id')
-    names = grouped['author_name'].apply(set).apply(', '.join).\
-        reset_index().rename(columns={'author_name': 'author_names'})
-    papers = grouped['paper_id'].apply(', '.join).reset_index().rename(columns={'paper_id': 'papers'})['papers']
-    man = pd.DataFrame([0] * grouped.ngroups, columns=['man'])
-    woman = pd.DataFrame([0] * grouped.ngroups, columns=['woman'])
-    neutral = grouped['neutral'].apply(lambda x: ', '.join(set(map(str, x)))).reset_index()['neutral']
-    unknown = grouped['unknown'].apply(lambda x: ', '.join(set(map(str, x)))).reset_index()['unknown']
-    df_new = pd.concat([names, man, woman, neutral, unknown, papers], axis=1)
+    columns = ['paper_id', 'author_id', 'author_name', 'neutral', 'unknown']
+    if isinstance(source, pd.DataFrame):
+        df = source[columns]
+    else:
+        df = pd.read_csv(source, usecols=columns, dtype={'paper_id': str, 'author_id': 'category',
+                                                         'author_name': 'category', 'neutral': 'int8',
+                                                         'unknown': 'int8'})
+    df = df[(df['neutral'] == 1) | (df['unknown'] == 1)]
+
+    known = None
+    if append and os.path.exists(destination):
+        known = pd.read_csv(destination, dtype={'author_id': str})
+        df = df[~df['author_id'].astype(str).isin(known['author_id'])]
+
+    # Group by the authors in order of appearance, names and papers keep the order of the source
+    codes, author_ids = pd.factorize(df['author_id'])
+    order = np.argsort(codes, kind='stable')
+    names = pd.DataFrame({'code': codes, 'author_name': df['author_name'].to_numpy(dtype=object)}).iloc[order]
+    names = names.drop_duplicates()
+    flags = df[['neutral', 'unknown']].groupby(codes).max()
+    df_new = pd.DataFrame({
+        'author_id': np.asarray(author_ids, dtype=object),
+        'author_names': [', '.join(group)
+                         for group in _group_lists(names['author_name'], names['code'], len(author_ids))],
+        'man': 0,
+        'woman': 0,
+        'neutral': flags['neutral'].to_numpy(),
+        'unknown': flags['unknown'].to_numpy(),
+        'papers': [', '.join(group)
+                   for group in _group_lists(df['paper_id'].to_numpy(dtype=object)[order], codes[order],
+                                             len(author_ids))]})
     df_new.sort_values(['unknown', 'author_names'], inplace=True)
-    df_new.to_csv(destination, index=False)
+
+    if known is None:
+        df_new.to_csv(destination, index=False)
+    else:
+        with open(destination, 'a+b') as file:
+            # Files edited by hand may miss the last line break
+            if file.seek(0, os.SEEK_END) > 0 and (file.seek(-1, os.SEEK_END), file.read(1))[1] != b'\n':
+                file.write(b'\n')
+        df_new.reindex(columns=known.columns).to_csv(destination, mode='a', index=False, header=False)
+    return len(df_new)
 
 
 def _load_identity_list():
@@ -412,34 +2558,97 @@ def _load_identity_list():
             identities.append(pd.read_csv(csv_file))
     if identities:
         identities = pd.concat(identities)
+    return _index_identity_list(identities)
 
-        # Remove still unidentified names and duplicates
-        identities = identities[(identities['man'] == 1) | (identities['woman'] == 1)]
-        identities.drop_duplicates(inplace=True)
+
+def _index_identity_list(identities):
+    """
+    Index manually identified genders by author_id. Still unidentified names are removed, duplicate entries of an
+    author are merged and authors with conflicting entries are reported and dropped.
+
+    :param identities:  pd.DataFrame with the columns 'author_id', 'man' and 'woman', or None
+    :return:            pd.DataFrame indexed by 'author_id' with the columns 'man', 'woman' and 'gender'
+    """
+    if identities is None or len(identities) == 0:
+        return pd.DataFrame({'man': [], 'woman': [], 'gender': []}, index=pd.Index([], name='author_id'))
+    if identities.index.name == 'author_id':
+        return identities
+
+    # Remove still unidentified names and duplicates
+    identities = identities[(identities['man'] == 1) | (identities['woman'] == 1)]
+    identities = identities[['author_id', 'man', 'woman']].astype({'man': int, 'woman': int}).drop_duplicates()
+
+    conflicting = identities['author_id'].duplicated(keep=False)
+    for author_id in identities.loc[conflicting, 'author_id'].unique():
+        click.echo(f"WARNING: More than one identity found for {author_id}, the identity is ignored")
+    identities = identities[~conflicting].set_index('author_id')
+    identities['gender'] = np.where(identities['woman'] == 1, 'woman', 'man')
     return identities
 
 
-def _load_gapi_list(gapi_path):
+def _gapi_files(gapi_path):
     if '.csv' in gapi_path:
-        gender_enriched_names = pd.read_csv(gapi_path, sep=';')
-    else:
-        glob_path = os.path.join(gapi_path, '*.csv')
-        gender_enriched_names = []
-        for csv_file in glob.glob(glob_path):
-            if 'sample_file.csv' not in csv_file:
-                gender_enriched_names.append(pd.read_csv(csv_file, sep=';'))
-        if gender_enriched_names:
-            gender_enriched_names = pd.concat(gender_enriched_names)
+        return [gapi_path]
+    glob_path = os.path.join(gapi_path, '*.csv')
+    return [csv_file for csv_file in sorted(glob.glob(glob_path)) if 'sample_file.csv' not in csv_file]
+
+
+def _gender_sources_digest(identity_list, gapi_path):
+    # Hash the known identities and the files imported into the store of Gender-API's names to invalidate cached genders
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(identity_list['gender']).to_numpy().tobytes())
+    digest.update(GenderResolver.from_path(gapi_path).store.digest().encode())
+    return digest.hexdigest()
+
+
+def _authorships_cache_path(csv_file, field, sources):
+    """
+    Build the path of the cached authorships of an input file. The name contains a hash of the file's content and of
+    the gender sources, so changed inputs are parsed again.
+
+    :param csv_file:    string, path to the input file
+    :param field:       string, name of the field
+    :param sources:     string or None, digest of the gender sources, None for authorships without genders
+    :return:            string, path to a feather file
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{_CACHE_VERSION};{field};{sources};{_file_digest(csv_file)}".encode())
+    kind = 'genders' if sources else 'names'
+    return os.path.join(_CACHE_DIR, 'authorships', f"{field}.{kind}.{digest.hexdigest()}.feather")
+
 
-    # Remove duplicates
-    gender_enriched_names.drop_duplicates(inplace=True)
-    return gender_enriched_names
+def _file_digest(path):
+    # Hash of a file's content, a file is only read once per process while its size and modification time are unchanged
+    stat = os.stat(path)
+    return _content_digest(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
 
 
-def _assume_gender_weighted(df):
+@functools.lru_cache(maxsize=None)
+def _content_digest(path, size, mtime_ns):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_cache(df, cache_path):
+    # Replace outdated entries of the same field and kind and write atomically
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    for outdated in glob.glob(cache_path.rsplit('.', 2)[0] + '.*.feather'):
+        os.remove(outdated)
+    df.reset_index(drop=True).to_feather(cache_path + '.tmp')
+    os.replace(cache_path + '.tmp', cache_path)
+
+
+def _assume_gender_weighted(df, seed=None):
     """
     Assume the gender of unknown/neutral names to be proportional
     to the ratio of known man/woman names in the remainder
+
+    :param df:      pd.DataFrame, containing authorships. See method 'authorships' for more details.
+    :param seed:    None, int or np.random.Generator, seed for the random assignment to make runs repeatable
+    :return:        pd.DataFrame, the given df with the assumed genders added
     """
 
     # Convert gender columns to booleans
@@ -448,35 +2657,59 @@ def _assume_gender_weighted(df):
     df['neutral'] = df['neutral'] == 1
     df['unknown'] = df['unknown'] == 1
 
-    # Calculate gender ratio
-    known = df[~df['neutral'] & ~df['unknown']]
-    woman_authors = known[known['woman']]['author_id'].nunique()
-    man_authors = known[known['man']]['author_id'].nunique()
-    woman_ratio = woman_authors / (woman_authors + man_authors)
-
     # Assume a gender for each author with unknown
     # gender based on the observed distribution
-    author_genders = {}
-    for author in df[df['unknown'] | df['neutral']]['author_id'].unique():
-        if random.random() <= woman_ratio:
-            author_genders[author] = 'woman'
-        else:
-            author_genders[author] = 'man'
+    woman_ratio = _woman_ratio(df)
+    uncertain = (df['unknown'] | df['neutral']).to_numpy()
+    author_codes, author_ids = pd.factorize(df.loc[uncertain, 'author_id'])
+    author_is_woman = np.random.default_rng(seed).random(len(author_ids)) <= woman_ratio
 
     # Set the assumed gender on the original dataframe
-    for index in df.index:
-        if df.loc[index, 'unknown'] or df.loc[index, 'neutral']:
-            gender = author_genders[df.loc[index, 'author_id']]
-            df.loc[index, gender] = True
+    is_woman = author_is_woman[author_codes]
+    woman = df['woman'].to_numpy(copy=True)
+    man = df['man'].to_numpy(copy=True)
+    woman[uncertain] |= is_woman
+    man[uncertain] |= ~is_woman
+    df['woman'] = woman
+    df['man'] = man
 
     # Convert boolean gender columns to 0/1's
-    df['man'] = df['man'].astype(int)
-    df['woman'] = df['woman'].astype(int, copy=False)
-    df['neutral'] = df['neutral'].astype(int, copy=False)
-    df['unknown'] = df['unknown'].astype(int, copy=False)
+    df['man'] = df['man'].astype(np.int8)
+    df['woman'] = df['woman'].astype(np.int8, copy=False)
+    df['neutral'] = df['neutral'].astype(np.int8, copy=False)
+    df['unknown'] = df['unknown'].astype(np.int8, copy=False)
     return df
 
 
+def _assume_gender_assigned(df, assignments):
+    """
+    Set the gender of unknown/neutral authors to the one assigned to them
+
+    :param df:          pd.DataFrame, containing authorships. See method 'authorships' for more details.
+    :param assignments: pd.Series of bool indexed by author_id, whether the author is assumed to be a woman. All
+                        unknown and neutral authors must be contained.
+    :return:            pd.DataFrame, a copy of df with the assumed genders added
+    """
+    df = df.copy()
+    uncertain = ((df['unknown'] == 1) | (df['neutral'] == 1)).to_numpy()
+    is_woman = assignments.reindex(df.loc[uncertain, 'author_id'].astype(str)).to_numpy(dtype=bool)
+    woman = df['woman'].to_numpy(copy=True)
+    man = df['man'].to_numpy(copy=True)
+    woman[uncertain] = is_woman
+    man[uncertain] = ~is_woman
+    df['woman'] = woman
+    df['man'] = man
+    return df
+
+
+def _woman_ratio(df):
+    # Calculate the ratio of unique woman among the unique authors with known gender
+    known = df[(df['neutral'] != 1) & (df['unknown'] != 1)]
+    woman_authors = known[known['woman'] == 1]['author_id'].nunique()
+    man_authors = known[known['man'] == 1]['author_id'].nunique()
+    return woman_authors / (woman_authors + man_authors)
+
+
 def _first_woman_author(group):
     # Check for the first author of a paper being a woman
     return group['woman'].iloc[0]
@@ -497,6 +2730,14 @@ def _all_woman_author(group):
     return group['woman'].all()
 
 
+_POSITION_REDUCTIONS = {
+    _first_woman_author: 'first',
+    _last_woman_author: 'last',
+    _any_woman_author: 'any',
+    _all_woman_author: 'all',
+}
+
+
 def _exclude_venue(df, venue):
     return df[~df['venue'].isin(venue)]
 
@@ -506,12 +2747,19 @@ def _get_field(df, field):
 
 
 if __name__ == '__main__':
-    import click
-
-
     @click.group()
-    def cli():
-        pass
+    @click.option('--profile', is_flag=True,
+                  help='Record time, rows, peak memory and name resolutions of each stage of the command')
+    @click.option('--profile-report', type=click.Path(dir_okay=False), default='output/profile.json',
+                  help='Path to the JSON report of --profile')
+    @click.option('--profile-stage', default=None,
+                  help='Run this stage under cProfile and save its statistics next to the report, implies --profile')
+    @click.pass_context
+    def cli(ctx, profile, profile_report, profile_stage):
+        global _profiler
+        if profile or profile_stage:
+            _profiler = Profiler(profile_report, profile_stage=profile_stage)
+            ctx.call_on_close(lambda: _profiler.save(ctx.invoked_subcommand))
 
 
     @cli.command(name='prepare-names-for-gapi')
@@ -523,21 +2771,117 @@ if __name__ == '__main__':
 
         :param destination: string, relative path to output file
         """
-        prepare_names_for_gapi(destination)
+        _profiled('prepare-names-for-gapi', prepare_names_for_gapi, destination)
 
 
     @cli.command(name='analyse-data')
     @click.argument('gapi_path', type=click.Path(file_okay=True, dir_okay=True))
-    def click_analyse_data(gapi_path):
+    @click.option('--seed', type=int, default=None, help='Seed for assuming the gender of unknown and neutral names')
+    @click.option('--replicates', type=int, default=None,
+                  help='Number of random gender assumptions to plot the mean and 95% interval of')
+    @click.option('--workers', type=int, default=1,
+                  help='Number of processes to parse the input files, compute the replicates and render the plots with')
+    @click.option('--streaming', is_flag=True, help='Process the input in chunks with bounded memory')
+    @click.option('--from-stage', type=click.Choice(_ANALYSIS_STAGES), default=None,
+                  help='Run this and all following stages even if they did not change')
+    @click.option('--only', type=click.Choice(_ANALYSIS_STAGES), multiple=True,
+                  help='Run only this stage even if it did not change, can be given more than once')
+    @click.option('--show', is_flag=True, help='Show the plots with titles after the analysis')
+    @click.option('--incremental', is_flag=True, help='Only process the years added since the last incremental run')
+    def click_analyse_data(gapi_path, seed, replicates, workers, streaming, from_stage, only, show, incremental):
         """
         Read the csv files given in '/input' (with commas as separators), extract authorships from it and enrich them
         with gender based on the file(s) given under param gapi_path (with semicolons as separators as the csv files
         returned by the Gender-API uses semicolons as separators). It produces plots saved to '/output' and also saves
         still unknown names under '/helper_files/unprocessed_first_names.csv' for future processing by the Gender-API.
 
-        :param gapi_path: path, both a file or a directory is accepted
+        :param gapi_path:   path, both a file or a directory is accepted
+        :param seed:        int, seed for assuming the gender of unknown and neutral names
+        :param replicates:  int, number of random gender assumptions to plot the mean and 95% interval of
+        :param workers:     int, number of processes to parse the input files, compute the replicates and render the
+                            plots with
+        :param streaming:   bool, whether to process the input in chunks with bounded memory
+        :param from_stage:  str, run this and all following stages even if they did not change
+        :param only:        tuple of str, run only these stages even if they did not change
+        :param show:        bool, whether to show the plots after the analysis
+        :param incremental: bool, whether to only process the years added since the last incremental run
+        """
+        analyse_data(gapi_path, seed=seed, replicates=replicates, workers=workers, streaming=streaming,
+                     from_stage=from_stage, only=list(only), show=show, incremental=incremental)
+
+
+    @cli.command(name='render')
+    @click.option('--source', type=click.Path(exists=True, dir_okay=False), default=_AGGREGATES_PATH,
+                  help='Path to the aggregates stored by analyse-data')
+    @click.option('--destination', type=click.Path(file_okay=False), default='output',
+                  help='Directory to save the plots to')
+    @click.option('--format', 'formats', type=click.Choice(['pgf', 'png', 'pdf']), multiple=True,
+                  help='File format of the plots, can be given more than once, default: pgf')
+    @click.option('--figure', 'figures', type=click.Choice(list(_FIGURES)), multiple=True,
+                  help='Plot to render, can be given more than once, default: all')
+    @click.option('--workers', type=int, default=1, help='Number of processes to render the plots with')
+    @click.option('--header', is_flag=True, help='Add a title to the plots')
+    @click.option('--force', is_flag=True, help='Render the plots even if they did not change')
+    def click_render(source, destination, formats, figures, workers, header, force):
         """
-        analyse_data(gapi_path)
+        Render the plots of the rolling means of authorships by woman from the aggregates stored by analyse-data,
+        without running the analysis again. Plots whose data and style did not change are skipped.
+
+        :param source:      path to the stored aggregates
+        :param destination: path to the directory to save the plots to
+        :param formats:     tuple of str, file formats of the plots
+        :param figures:     tuple of str, names of the plots to render
+        :param workers:     int, number of processes to render the plots with
+        :param header:      bool, whether to add a title to the plots
+        :param force:       bool, whether to render unchanged plots, too
+        """
+        _profiled('render', lambda: render_figures(source, destination, formats=list(formats) or ['pgf'],
+                                                   figures=list(figures) or None, workers=workers, header=header,
+                                                   force=force))
+
+
+    @cli.command(name='resolve-names')
+    @click.argument('gapi_path', type=click.Path(file_okay=False))
+    @click.option('--source', type=click.Path(exists=True, dir_okay=False),
+                  default='helper_files/unprocessed_first_names.csv', help='Path to csv file with first names')
+    @click.option('--url', default=_GAPI_URL, help='Endpoint compatible with Gender-API\'s multi name query')
+    @click.option('--key', envvar='GENDER_API_KEY', default=None, help='API key, default: $GENDER_API_KEY')
+    @click.option('--batch-size', type=int, default=100, help='Number of names per request')
+    @click.option('--concurrency', type=int, default=4, help='Number of requests in flight at the same time')
+    @click.option('--rate', type=float, default=None, help='Maximum number of requests per second')
+    def click_resolve_names(gapi_path, source, url, key, batch_size, concurrency, rate):
+        """
+        Look up the genders of the first names in source that are not yet known under gapi_path with the Gender-API
+        and save the results as a new csv file under gapi_path.
+
+        :param gapi_path:   path to the directory of the files returned by the Gender-API
+        """
+        _profiled('resolve-names', lambda: resolve_names_with_gapi(
+            source, gapi_path, url=url, key=key, batch_size=batch_size, concurrency=concurrency, rate=rate))
+
+
+    @cli.command(name='ingest-dblp-xml')
+    @click.argument('source', type=click.Path(exists=True, dir_okay=False))
+    @click.argument('venues', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--destination', type=click.Path(file_okay=False), default='input',
+                  help='Directory to write one feather file per field to')
+    @click.option('--person-ids/--no-person-ids', default=True,
+                  help='Whether to map author names to dblp person ids with a first pass over the dump')
+    def click_ingest_dblp_xml(source, venues, destination, person_ids):
+        """
+        Stream-parse a dblp XML dump (plain or gzipped) and write the authorships of all papers of the venues given in
+        the venue mapping file to one feather file per field under destination. See
+        'helper_files/dblp_venues.csv' for a mapping file of the venues used in our publication.
+
+        :param source:      path to dblp.xml or dblp.xml.gz
+        :param venues:      path to csv file with the columns 'toc', 'venue' and 'field'
+        :param destination: path to directory
+        :param person_ids:  bool, whether to map author names to dblp person ids
+        """
+        counts = _profiled('ingest-dblp-xml', lambda: ingest_dblp_xml(source, venues, destination,
+                                                                      person_ids=person_ids))
+        for (field, count) in sorted(counts.items()):
+            click.echo(f"Wrote {count} authorships of field {field} to {destination}")
 
 
     @cli.command(name='extract-unknown-neutrals')
@@ -545,17 +2889,49 @@ if __name__ == '__main__':
                   help='Path to csv file')
     @click.option('--destination', type=click.Path(), default='input/known_identities/authors_neutral_unknown.csv',
                   help='Path to csv file')
-    def click_extract_unknown_neutrals(source, destination):
+    @click.option('--gapi-path', type=click.Path(exists=True), default=None,
+                  help='Read the cached authorships annotated with this Gender-API path instead of the source csv file')
+    @click.option('--append', is_flag=True, help='Only add authors that are not in the destination file yet')
+    def click_extract_unknown_neutrals(source, destination, gapi_path, append):
         """
         Read the source csv file, extract names with unknown or neutral names, merge all unique names and paper_ids with
         the same author_id into columns 'author_names' and 'papers' and write pd.DataFrame to destination.
         Result can be used to manually annotate the gender from known persons.
         :param source:      path to csv file
         :param destination: path to csv file
+        :param gapi_path:   path to the Gender-API file(s), if given the cached authorships are used as source
+        :param append:      bool, whether to add only new authors to destination
+        """
+        if gapi_path is not None:
+            identities = _load_identity_list()
+            source = _profiled('authorships', lambda: authorships(with_accuracy=True, identity_list=identities,
+                                                                  gapi_path=gapi_path))
+        else:
+            click.echo(f"Read file from {source}")
+        written = _profiled('extract-unknown-neutrals',
+                            lambda: extract_unknown_neutrals(source, destination, append=append))
+        click.echo(f"Write {written} authors to {destination}")
+
+
+    @cli.command(name='serve')
+    @click.argument('gapi_path', type=click.Path(exists=True))
+    @click.option('--host', default='127.0.0.1')
+    @click.option('--port', type=int, default=8000)
+    @click.option('--seed', type=int, default=None, help='Seed for assuming the gender of unknown and neutral names')
+    @click.option('--cache-size', type=int, default=256, help='Number of answers of aggregate queries to keep')
+    def click_serve(gapi_path, host, port, seed, cache_size):
+        """
+        Load the gender-enriched authorships once and answer aggregate queries over HTTP with JSON, e.g.
+        'curl "http://127.0.0.1:8000/aggregate?group_attrs=venue,year&fields=DB&positions=first&window=3"'.
+        See 'AnalysisServer' for all queries.
+
+        :param gapi_path:   path, both a file or a directory is accepted
+        :param seed:        int, seed for assuming the gender of unknown and neutral names
+        :param cache_size:  int, number of answers of aggregate queries to keep
         """
-        click.echo(f"Read file from {source}")
-        extract_unknown_neutrals(source, destination)
-        click.echo(f"Write file to {destination}")
+        server = _profiled('serve', lambda: AnalysisServer((host, port), gapi_path, seed=seed, cache_size=cache_size))
+        click.echo(f"Serve the analysis on {server.url}")
+        server.serve_forever()
 
 
     cli()
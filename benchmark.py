@@ -0,0 +1,348 @@
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import time
+import click
+import numpy as np
+import pandas as pd
+
+import analyse_dblp_data as analysis
+
+_FIELDS = {
+    'DB': ['SIGMOD', 'VLDB', 'ICDE', 'PODS', 'CIDR', 'EDBT', 'DASFAA', 'DKE'],
+    'Algorithms': ['SODA', 'STOC', 'FOCS'],
+    'HCI': ['CHI', 'UIST', 'UbiComp'],
+    'Networking': ['SIGCOMM', 'NSDI', 'IMC'],
+    'OS': ['OSDI', 'SOSP', 'USENIX'],
+}
+_SYLLABLES = np.array([consonant + vowel for consonant in 'bcdfghjklmnprstvwz' for vowel in 'aeiou'], dtype=object)
+_PARTICLES = np.array(['van', 'von', 'de', 'van der', 'del', 'da', 'di', 'dos', 'ter', 'zur'], dtype=object)
+_STAGES = ['authorships', 'authorships-cached', 'gapi_gender', '_assume_gender_weighted', 'aggregate_authorship',
+           'cube', 'replicate_aggregate_authorship', 'extract_unknown_neutrals', 'plot']
+_GAPI_GENDER_NAMES = 20000
+# Results of all runs, kept out of the repository like the generated files
+_RESULTS = os.path.join(analysis._CACHE_DIR, 'benchmark', 'results.jsonl')
+
+
+def generate(directory, authorships=100000, seed=0):
+    """
+    Write synthetic, dblp-shaped input files under 'directory/input', a matching identity list under
+    'directory/input/known_identities' and a Gender-API file under 'directory/helper_files/GenderAPI'.
+
+    Papers have 1 + negative binomial distributed numbers of authors, authors publish with a power law distribution and
+    the papers per year grow over time. Names come with middle names or initials, 'Jr.', nobiliary particles, dblp's
+    numeric suffixes for homonyms and '&apos;'. About 8% of the first names are missing from the Gender-API file and
+    0.5% of the authors are known identities.
+
+    :param directory:   path, created if it does not exist
+    :param authorships: int, approximate number of authorships to generate
+    :param seed:        int, seed of the generator, the same seed and size give the same files
+    :return:            int, number of generated authorships
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(directory, 'input', 'known_identities'), exist_ok=True)
+    os.makedirs(os.path.join(directory, 'helper_files', 'GenderAPI'), exist_ok=True)
+
+    first_names = _vocabulary(rng, max(1000, min(60000, authorships // 20)), 2, 3)
+    last_names = _vocabulary(rng, max(2000, min(400000, authorships // 5)), 2, 4)
+    pool = _authors(rng, max(100, authorships // 4), first_names, last_names)
+
+    # Authors per paper: mean of about 3.5, papers per year growing by 6% a year
+    venues = [(field, venue) for field, field_venues in _FIELDS.items() for venue in field_venues]
+    years = np.arange(1975, 2021)
+    year_weights = np.exp(0.06 * (years - years[0]))
+    author_weights = 1 / np.arange(1, len(pool) + 1) ** 0.8
+    author_weights /= author_weights.sum()
+
+    generated = 0
+    papers_total = max(1, authorships * 2 // 7)
+    for field in _FIELDS:
+        rows = []
+        for venue in _FIELDS[field]:
+            count = papers_total // len(venues)
+            author_counts = np.minimum(1 + rng.negative_binomial(2, 0.44, size=count), 30)
+            paper_years = np.sort(rng.choice(years, size=count, p=year_weights / year_weights.sum()))
+            slots = rng.choice(len(pool), size=author_counts.sum(), p=author_weights)
+            papers = np.repeat(np.arange(count), author_counts)
+            authors = pd.Series(pool['label'].to_numpy()[slots]).groupby(papers).agg('; '.join)
+            keys = [f"{venue}{year % 100:02d}-{number}" for (number, year) in enumerate(paper_years)]
+            rows.append(pd.DataFrame({
+                'venue': venue,
+                'year': paper_years,
+                'identifier': [f"conf/{venue.lower()}/{venue.lower()}{year}" for year in paper_years],
+                'heading': '',
+                'paper_id': [f"https://dblp.org/db/conf/{venue.lower()}/{venue.lower()}{year}.html#conf/"
+                             f"{venue.lower()}/{key}" for (year, key) in zip(paper_years, keys)],
+                'title': [f"Synthetic Paper {key}." for key in keys],
+                'authors': authors.to_numpy(),
+                'electronic_edition': '',
+                'comment': '',
+            }))
+            generated += int(author_counts.sum())
+        pd.concat(rows).to_csv(os.path.join(directory, 'input', f"{field}.csv"), index=False)
+
+    # Most first names are known, a tenth of them to the Gender-API as 'unknown'
+    known = first_names[rng.random(len(first_names)) < 0.92]
+    genders = rng.choice(['male', 'female', 'unknown'], size=len(known), p=[0.6, 0.3, 0.1])
+    pd.DataFrame({
+        'first_name': known,
+        'ga_first_name': known,
+        'ga_gender': genders,
+        'ga_accuracy': np.where(genders == 'unknown', 50, rng.integers(55, 100, size=len(known))),
+        'ga_samples': np.where(genders == 'unknown', 0, rng.integers(1, 100000, size=len(known))),
+    }).to_csv(os.path.join(directory, 'helper_files', 'GenderAPI', 'synthetic.csv'), sep=';', index=False)
+
+    identities = pool.sample(frac=0.005, random_state=seed)
+    woman = rng.random(len(identities)) < 0.3
+    pd.DataFrame({
+        'author_id': identities['author_id'].to_numpy(),
+        'author_names': identities['name'].to_numpy(),
+        'man': (~woman).astype(int),
+        'woman': woman.astype(int),
+        'neutral': 0,
+        'unknown': 0,
+        'papers': '',
+    }).to_csv(os.path.join(directory, 'input', 'known_identities', 'synthetic.csv'), index=False)
+    return generated
+
+
+def _vocabulary(rng, size, min_syllables, max_syllables):
+    # Distinct, capitalized names made of random syllables
+    names = set()
+    while len(names) < size:
+        lengths = rng.integers(min_syllables, max_syllables + 1, size=size)
+        syllables = rng.choice(_SYLLABLES, size=(size, max_syllables))
+        names.update(''.join(row[:length]).capitalize() for row, length in zip(syllables, lengths))
+    return np.array(sorted(names)[:size], dtype=object)
+
+
+def _authors(rng, size, first_names, last_names):
+    """
+    :return: pd.DataFrame with the columns 'author_id', 'name' and the 'label' used in the 'authors' column
+    """
+    # Popular first names are more common
+    first_weights = 1 / np.arange(1, len(first_names) + 1)
+    first = pd.Series(rng.choice(first_names, size=size, p=first_weights / first_weights.sum()))
+    middle = pd.Series(rng.choice(first_names, size=size))
+    last = pd.Series(rng.choice(last_names, size=size))
+    kind = rng.choice(['plain', 'initial', 'middle', 'first_initial', 'suffix', 'particle', 'apostrophe', 'homonym',
+                       'single'], size=size, p=[0.52, 0.2, 0.05, 0.05, 0.02, 0.06, 0.03, 0.06, 0.01])
+
+    name = first + ' ' + last
+    name = name.mask(kind == 'initial', first + ' ' + middle.str[0] + '. ' + last)
+    name = name.mask(kind == 'middle', first + ' ' + middle + ' ' + last)
+    # Only the middle name can be resolved
+    name = name.mask(kind == 'first_initial', first.str[0] + '. ' + middle + ' ' + last)
+    name = name.mask(kind == 'suffix', first + ' ' + last + pd.Series(rng.choice([' Jr.', ' Sr.'], size=size)))
+    name = name.mask(kind == 'particle', first + ' ' + pd.Series(rng.choice(_PARTICLES, size=size)) + ' ' + last)
+    name = name.mask(kind == 'apostrophe', first + " O'" + last)
+    name = name.mask(kind == 'single', last)
+
+    # dblp's ids are either numeric or derived from the name, homonyms get a numeric suffix in their name
+    index = pd.Series(np.arange(size))
+    author_id = (index % 100).map('{:02d}'.format) + '/' + (index // 100).astype(str)
+    named = rng.random(size) < 0.3
+    author_id = author_id.mask(named, last.str[0].str.lower() + '/' + first + last + index.astype(str))
+    label = name.str.replace("'", '&apos;', regex=False)
+    label = label.mask(kind == 'homonym', label + ' ' + (index % 9 + 1).map('{:04d}'.format))
+    return pd.DataFrame({'author_id': author_id, 'name': name, 'label': author_id + ': ' + label})
+
+
+def run(directory, stages=None, workers=1, replicates=20):
+    """
+    Run the stages of the analysis on the files generated under directory and measure each of them.
+
+    :param directory:   path, containing files written by 'generate'
+    :param stages:      None or list of str, stages to measure, default: all in _STAGES. Stages depend on the
+                        authorships and the assumed genders, these are computed without measuring if not selected.
+    :param workers:     int, number of processes to parse the input files and compute the replicates with
+    :param replicates:  int, number of replicates of 'replicate_aggregate_authorship'
+    :return:            dict of measures by stage with the keys 'seconds', 'rows', 'rows_per_second' and
+                        'peak_rss_bytes', or 'error' if the stage failed
+    """
+    stages = _STAGES if stages is None else stages
+    results = {}
+
+    def measure(stage, fn, rows=None):
+        # Return None without running fn if the stage is not selected or failed
+        if stage not in stages:
+            return None
+        click.echo(f"Benchmark {stage}")
+        try:
+            with analysis.PeakMemory() as memory:
+                start = time.perf_counter()
+                value = fn()
+                seconds = time.perf_counter() - start
+        except Exception as error:
+            results[stage] = {'error': f"{type(error).__name__}: {error}"}
+            return None
+        rows = rows if rows is not None else len(value)
+        results[stage] = {'seconds': seconds, 'rows': rows, 'rows_per_second': rows / seconds if seconds else None,
+                          'peak_rss_bytes': memory.peak}
+        return value
+
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        gapi_path = 'helper_files/GenderAPI'
+        identities = analysis._load_identity_list()
+        _remove_caches()
+        os.makedirs('output/with_genders', exist_ok=True)
+
+        def load():
+            return analysis.authorships(with_accuracy=True, identity_list=identities, gapi_path=gapi_path,
+                                        workers=workers)
+
+        # The first run fills the cache of the authorships
+        df = measure('authorships', load)
+        if df is None:
+            df = load()
+        measure('authorships-cached', load)
+
+        names = df['author_name'].drop_duplicates().head(_GAPI_GENDER_NAMES).tolist()
+        measure('gapi_gender', lambda: [analysis.gapi_gender(name, gapi_path) for name in names])
+        df_with_assumed = measure('_assume_gender_weighted', lambda: analysis._assume_gender_weighted(df, seed=0))
+        if df_with_assumed is None:
+            df_with_assumed = analysis._assume_gender_weighted(df, seed=0)
+        aggregates = measure('aggregate_authorship', lambda: analysis.aggregate_authorship(df_with_assumed),
+                             rows=len(df_with_assumed))
+        measure('cube', lambda: analysis.AuthorshipCube.from_authorships(df_with_assumed), rows=len(df_with_assumed))
+        measure('replicate_aggregate_authorship', lambda: analysis.replicate_aggregate_authorship(
+            df_with_assumed, replicates, seed=0, workers=workers), rows=len(df_with_assumed) * replicates)
+
+        if 'extract_unknown_neutrals' in stages:
+            df.to_csv('output/with_genders/authorships_all_fields.csv', index=False)
+        measure('extract_unknown_neutrals', lambda: analysis.extract_unknown_neutrals(
+            'output/with_genders/authorships_all_fields.csv', 'output/unknown_neutrals.csv'), rows=len(df))
+
+        if 'plot' in stages and aggregates is None:
+            aggregates = analysis.aggregate_authorship(df_with_assumed)
+        measure('plot', lambda: analysis.plot_moving_averages_of_authorships(
+            aggregates['first'], 'first author', save=True, header=False),
+            rows=len(aggregates['first']) if aggregates else 0)
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def _remove_caches():
+    # Measure the stages without results of earlier runs
+    shutil.rmtree(analysis._CACHE_DIR, ignore_errors=True)
+    analysis.GenderResolver._resolvers.clear()
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results_file, baseline=None, candidate=None):
+    """
+    Compare the measures of two runs of the same size in the results file.
+
+    :param results_file:    path to the JSON lines file written by the 'run' command
+    :param baseline:        None or str, commit of the baseline run, default: the second to last run
+    :param candidate:       None or str, commit of the compared run, default: the last run
+    :return:                pd.DataFrame with the seconds and peak RSS of both runs and their ratio per stage
+    """
+    with open(results_file) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+
+    def find(commit, default):
+        if commit is None:
+            if len(runs) < 2:
+                raise ValueError(f"At least two runs are needed in {results_file}")
+            return runs[default]
+        matching = [entry for entry in runs if (entry['commit'] or '').startswith(commit)]
+        if not matching:
+            raise ValueError(f"No run of commit {commit} in {results_file}")
+        return matching[-1]
+
+    new = find(candidate, -1)
+    old = find(baseline, -2)
+    if old['authorships'] != new['authorships']:
+        click.echo(f"WARNING: Comparing runs of {old['authorships']} and {new['authorships']} authorships")
+    table = pd.DataFrame({
+        'seconds_old': {stage: values.get('seconds') for stage, values in old['stages'].items()},
+        'seconds_new': {stage: values.get('seconds') for stage, values in new['stages'].items()},
+        'rss_mb_old': {stage: values.get('peak_rss_bytes', np.nan) / 2 ** 20
+                       for stage, values in old['stages'].items()},
+        'rss_mb_new': {stage: values.get('peak_rss_bytes', np.nan) / 2 ** 20
+                       for stage, values in new['stages'].items()},
+    }).astype(float)
+    table['speedup'] = table['seconds_old'] / table['seconds_new']
+    table.index.name = f"{old['commit']} -> {new['commit']}"
+    return table
+
+
+if __name__ == '__main__':
+    @click.group()
+    def cli():
+        pass
+
+    @cli.command(name='generate')
+    @click.argument('directory', type=click.Path(file_okay=False))
+    @click.option('--authorships', type=int, default=100000, help='Approximate number of authorships')
+    @click.option('--seed', type=int, default=0, help='Seed of the generator')
+    def click_generate(directory, authorships, seed):
+        """
+        Write synthetic input files, an identity list and a Gender-API file under directory.
+        """
+        click.echo(f"Generated {generate(directory, authorships, seed)} authorships under {directory}")
+
+    @cli.command(name='run')
+    @click.option('--authorships', type=int, default=100000, help='Approximate number of authorships')
+    @click.option('--seed', type=int, default=0, help='Seed of the generator')
+    @click.option('--directory', type=click.Path(file_okay=False), default=None,
+                  help='Directory of the generated files, default: .cache/benchmark/<authorships>-<seed>')
+    @click.option('--stage', 'stages', type=click.Choice(_STAGES), multiple=True,
+                  help='Stage to measure, can be given more than once, default: all')
+    @click.option('--workers', type=int, default=1, help='Number of processes')
+    @click.option('--replicates', type=int, default=20, help='Number of replicates')
+    @click.option('--results', type=click.Path(dir_okay=False), default=_RESULTS,
+                  help='JSON lines file the measures are appended to')
+    def click_run(authorships, seed, directory, stages, workers, replicates, results):
+        """
+        Generate the synthetic files if they do not exist yet, measure wall time, throughput and peak RSS of each stage
+        and append them with the current commit to the results file.
+        """
+        directory = directory or os.path.join(analysis._CACHE_DIR, 'benchmark', f"{authorships}-{seed}")
+        marker = os.path.join(directory, 'generated.json')
+        if not os.path.exists(marker):
+            generated = generate(directory, authorships, seed)
+            with open(marker, 'w') as f:
+                json.dump({'authorships': authorships, 'seed': seed, 'generated': generated}, f)
+            click.echo(f"Generated {generated} authorships under {directory}")
+
+        measures = run(directory, stages=list(stages) or None, workers=workers, replicates=replicates)
+        entry = {'commit': _commit(), 'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                 'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+                 'authorships': authorships, 'seed': seed, 'workers': workers, 'stages': measures}
+        if os.path.dirname(results):
+            os.makedirs(os.path.dirname(results), exist_ok=True)
+        with open(results, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+        table = pd.DataFrame(measures).T
+        table['peak_rss_mb'] = table.get('peak_rss_bytes', np.nan) / 2 ** 20
+        click.echo(table.drop(columns=['peak_rss_bytes'], errors='ignore').to_string())
+        click.echo(f"Appended the results to {results}")
+
+    @cli.command(name='compare')
+    @click.option('--results', type=click.Path(exists=True, dir_okay=False), default=_RESULTS,
+                  help='JSON lines file written by the run command')
+    @click.option('--baseline', default=None, help='Commit of the baseline, default: second to last run')
+    @click.option('--candidate', default=None, help='Commit to compare, default: last run')
+    def click_compare(results, baseline, candidate):
+        """
+        Print the seconds and peak RSS per stage of two runs and the speedup of the candidate.
+        """
+        click.echo(compare(results, baseline, candidate).to_string())
+
+    cli()
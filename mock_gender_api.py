@@ -0,0 +1,113 @@
+import hashlib
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockGenderAPIHandler(BaseHTTPRequestHandler):
+    """
+    Answers Gender-API's multi name queries ('/get?name=<name>;<name>&multi=true') with made up but deterministic
+    genders, so the resolve-names command can be tested and benchmarked offline.
+    """
+    # Keep connections alive like the Gender-API does
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        if url.path != '/get' or 'name' not in query:
+            self._send(400, {'errno': 30, 'errmsg': 'missing name parameter'})
+            return
+        if not self.server.admit():
+            self._send(429, {'errno': 50, 'errmsg': 'too many requests'})
+            return
+        time.sleep(self.server.latency)
+        self.server.count(len(query['name'][0].split(';')))
+        self._send(200, {'result': [gender_of(name) for name in query['name'][0].split(';')]})
+
+    def _send(self, status, answer):
+        body = json.dumps(answer).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockGenderAPI(ThreadingHTTPServer):
+    """
+    Local stand-in for the Gender-API.
+
+    :param address:     tuple of host and port, port 0 picks a free port
+    :param latency:     float, seconds each request takes
+    :param rate:        None or float, requests per second above which requests are rejected with status 429
+    """
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, rate=None):
+        super().__init__(address, MockGenderAPIHandler)
+        self.latency = latency
+        self.rate = rate
+        self.requests = 0
+        self.names = 0
+        self._lock = threading.Lock()
+        self._last = 0
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/get"
+
+    def admit(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.rate and now - self._last < 1 / self.rate:
+                return False
+            self._last = now
+            return True
+
+    def count(self, names):
+        with self._lock:
+            self.requests += 1
+            self.names += names
+
+
+def gender_of(name):
+    """
+    Derive a gender, accuracy and number of samples from a hash of the name, like the Gender-API names with low accuracy
+    are rare and unknown names have no samples.
+
+    :param name:    string, first name
+    :return:        dict in the format of a result of Gender-API's multi name query
+    """
+    value = int.from_bytes(hashlib.blake2b(name.lower().encode(), digest_size=8).digest(), 'little')
+    if value % 10 == 0:
+        return {'name': name.lower(), 'name_sanitized': name.capitalize(), 'gender': 'unknown', 'samples': 0,
+                'accuracy': 0}
+    gender = 'female' if value % 10 < 4 else 'male'
+    return {'name': name.lower(), 'name_sanitized': name.capitalize(), 'gender': gender,
+            'samples': (value >> 8) % 100000, 'accuracy': 50 + (value >> 32) % 50}
+
+
+if __name__ == '__main__':
+    import click
+
+    @click.command()
+    @click.option('--host', default='127.0.0.1')
+    @click.option('--port', type=int, default=8080)
+    @click.option('--latency', type=float, default=0.0, help='Seconds each request takes')
+    @click.option('--rate', type=float, default=None, help='Requests per second above which requests are rejected')
+    def cli(host, port, latency, rate):
+        """
+        Serve a local stand-in for the Gender-API, use it with
+        'analyse_dblp_data.py resolve-names --url http://<host>:<port>/get'.
+        """
+        server = MockGenderAPI((host, port), latency=latency, rate=rate)
+        click.echo(f"Serve a mock Gender-API on {server.url}")
+        server.serve_forever()
+
+    cli()